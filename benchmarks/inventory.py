@@ -0,0 +1,90 @@
+"""Maps a large inventory while another task ticks on the event loop, and
+reports how long mapping took and the longest time the loop was blocked.
+
+    python -m benchmarks.inventory --items 3000 --classes 2000
+"""
+
+import argparse
+import asyncio
+import time
+from copy import deepcopy
+
+from tf2_utils import map_inventory
+
+from express.inventory import map_tradable_inventory_async
+from express.utils import read_json_file
+
+ITEM = read_json_file("./tests/jsons/inventory_item.json")
+
+
+def get_inventory(items: int, classes: int) -> dict:
+    descriptions = []
+
+    for class_id in range(classes):
+        description = deepcopy(ITEM)
+        description["classid"] = str(class_id)
+        description.pop("assetid")
+        descriptions.append(description)
+
+    assets = [
+        {
+            "appid": 440,
+            "contextid": "2",
+            "assetid": str(asset_id),
+            "classid": str(asset_id % classes),
+            "instanceid": ITEM["instanceid"],
+            "amount": "1",
+        }
+        for asset_id in range(items)
+    ]
+
+    return {"assets": assets, "descriptions": descriptions}
+
+
+async def measure_stall(done: asyncio.Event) -> float:
+    longest = 0.0
+
+    while not done.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0)
+        longest = max(longest, time.perf_counter() - start)
+
+    return longest
+
+
+async def run_scenario(name: str, inventory: dict, coroutine_function) -> None:
+    done = asyncio.Event()
+    monitor = asyncio.create_task(measure_stall(done))
+    await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    items = await coroutine_function(inventory)
+    elapsed = time.perf_counter() - start
+    done.set()
+
+    stall = await monitor
+    print(
+        f"  {name:<28} {elapsed * 1000:8.1f}ms total "
+        f"{stall * 1000:8.1f}ms longest stall  {len(items)} items"
+    )
+
+
+async def map_inline(inventory: dict) -> list[dict]:
+    return map_inventory(inventory, add_skus=True, skip_untradable=True)
+
+
+async def main(args) -> None:
+    inventory = get_inventory(args.items, args.classes)
+    print(f"{args.items} items with {args.classes} different descriptions")
+
+    await run_scenario("tf2_utils map_inventory", inventory, map_inline)
+    await run_scenario("chunked dict lookup", inventory, map_tradable_inventory_async)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=3000)
+    parser.add_argument("--classes", type=int, default=2000)
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
@@ -0,0 +1,209 @@
+"""Drives ListingManager against a local fake Backpack.TF and reports calls,
+bytes and wall time for a full relist, a price update storm and a restart.
+
+    python -m benchmarks.listing_manager --items 1000 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+from tf2_utils import SchemaItemsUtils
+
+from express.inventory import ExpressInventory
+from express.managers.listing_manager import ListingManager
+from express.options import Options
+from express.scheduler import TokenBucket
+from tests.mock.backpack_tf import FakeBackpackTF
+from tests.mock.database import Database
+from tests.mock.express import Express
+
+STEAM_ID = "76561198828172881"
+KEY_SCRAP_PRICE = 540
+
+
+class PricingManager:
+    def get_key_scrap_price(self, intent: str) -> int:
+        return KEY_SCRAP_PRICE
+
+
+def get_item_names(amount: int) -> list[tuple[int, str]]:
+    """Items with only one defindex, so listings can be matched by name"""
+    schema = SchemaItemsUtils()
+    names = [
+        (defindexes[0], name)
+        for name, defindexes in schema.defindex_names.items()
+        if len(defindexes) == 1 and defindexes[0] not in [5000, 5001, 5002, 5021]
+    ]
+    assert len(names) >= amount, f"Schema only has {len(names)} usable items"
+    return sorted(names)[:amount]
+
+
+def get_pricelist(names: list[tuple[int, str]]) -> list[dict]:
+    return [
+        {
+            "sku": f"{defindex};6",
+            "name": name,
+            "buy": {"keys": 0, "metal": round(1 + i % 50 * 0.11, 2)},
+            "sell": {"keys": 0, "metal": round(1.11 + i % 50 * 0.11, 2)},
+            "max_stock": -1,
+            "autoprice": True,
+        }
+        for i, (defindex, name) in enumerate(names)
+    ]
+
+
+def get_inventory(names: list[tuple[int, str]], pure: int) -> list[dict]:
+    # we have every other item, and keys and refined to buy with
+    items = [(defindex, name) for defindex, name in names[::2]]
+    items += [(5021, "Mann Co. Supply Crate Key")] * pure
+    items += [(5002, "Refined Metal")] * pure
+
+    return [
+        {
+            "assetid": str(asset_id),
+            "classid": str(defindex),
+            "instanceid": "0",
+            "sku": f"{defindex};6",
+            "market_hash_name": name,
+            "tags": [],
+        }
+        for asset_id, (defindex, name) in enumerate(items, start=1)
+    ]
+
+
+def get_listing_manager(
+    server: FakeBackpackTF, database: Database, inventory: list[dict], args
+) -> ListingManager:
+    options = Options(
+        username="benchmark",
+        use_backpack_tf=True,
+        backpack_tf_token="token",
+        backpack_tf_api_key="key",
+    )
+    client = Express(STEAM_ID, options)
+    client.database = database
+    client.pricing_manager = PricingManager()
+    client.inventory_manager = ExpressInventory(STEAM_ID)
+    client.inventory_manager.set_our_inventory(inventory)
+
+    listing_manager = ListingManager(client)
+    listing_manager.setup()
+    listing_manager.backpack_tf.URL = server.url
+
+    # measure our own cost instead of waiting on the real rate limits
+    if not args.real_rate_limits:
+        for name in listing_manager.backpack_tf.scheduler.buckets:
+            listing_manager.backpack_tf.scheduler.buckets[name] = TokenBucket(
+                1000.0, 1000
+            )
+
+    return listing_manager
+
+
+def report(name: str, server: FakeBackpackTF, elapsed: float, error: str) -> None:
+    print(f"\n{name}: {elapsed:.3f}s {error}")
+
+    for endpoint, stats in sorted(server.stats.items()):
+        print(
+            f"  {endpoint:<42} calls={stats['calls']:<5} "
+            f"sent={stats['received']:<9} received={stats['sent']:<9} "
+            f"errors={stats['errors']}"
+        )
+
+    print(
+        f"  {'total':<42} calls={server.get_total('calls'):<5} "
+        f"sent={server.get_total('received'):<9} "
+        f"received={server.get_total('sent'):<9} "
+        f"errors={server.get_total('errors')}"
+    )
+    server.reset_stats()
+
+
+async def run_scenario(name: str, server: FakeBackpackTF, coroutine) -> None:
+    server.reset_stats()
+    start = time.perf_counter()
+    error = ""
+
+    try:
+        await coroutine
+    except Exception as e:
+        error = f"(failed: {e!r})"
+
+    report(name, server, time.perf_counter() - start, error)
+
+
+async def price_storm(listing_manager: ListingManager, database: Database) -> None:
+    skus = database.get_skus()
+
+    # every price moves by a scrap, like a pricer update would
+    for sku in skus:
+        item = database.items[sku]
+        item["sell"] = {"keys": 0, "metal": round(item["sell"]["metal"] + 0.11, 2)}
+        listing_manager.set_price_changed(sku)
+
+    await listing_manager.reconcile_listings(listing_manager._pop_dirty_skus())
+
+
+async def restock(listing_manager: ListingManager, amount: int) -> None:
+    inventory = listing_manager.inventory_manager
+    items = [i for i in inventory.get_our_inventory() if i["classid"] != "5021"]
+    skus = set()
+
+    # a trade gave us one more of a few items we already have
+    for i, item in enumerate(items[:amount]):
+        inventory.add_item(item.to_dict() | {"assetid": str(10**9 + i)})
+        skus.add(item["sku"])
+
+    listing_manager.set_inventory_changed(skus)
+    await listing_manager.reconcile_listings(listing_manager._pop_dirty_skus())
+
+
+async def restart(listing_manager: ListingManager) -> None:
+    await listing_manager.restore_listings()
+    await listing_manager.reconcile_listings()
+
+
+async def main(args) -> None:
+    names = get_item_names(args.items)
+    database = Database(get_pricelist(names))
+    inventory = get_inventory(names, args.pure)
+    server = FakeBackpackTF(
+        STEAM_ID, latency=args.latency, error_rate=args.error_rate, retry_after=0.1
+    )
+
+    print(
+        f"{len(names)} priced items, {len(inventory)} items in inventory, "
+        f"{args.latency}s latency, {args.error_rate} error rate"
+    )
+
+    with server:
+        listing_manager = get_listing_manager(server, database, inventory, args)
+
+        await run_scenario("full relist", server, listing_manager.reconcile_listings())
+        await run_scenario(
+            "price storm", server, price_storm(listing_manager, database)
+        )
+        await run_scenario("restock", server, restock(listing_manager, args.restock))
+
+        inventory = listing_manager.inventory_manager.get_our_inventory()
+        listing_manager = get_listing_manager(server, database, inventory, args)
+        await run_scenario("restart", server, restart(listing_manager))
+
+        print(f"\n{len(server.listings)} listings on the fake Backpack.TF")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--pure", type=int, default=100)
+    parser.add_argument("--restock", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--real-rate-limits", action="store_true")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level)
+    asyncio.run(main(args))
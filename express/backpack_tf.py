@@ -0,0 +1,127 @@
+import logging
+
+from backpack_tf import BackpackTF, Listing
+from backpack_tf.utils import needs_token
+
+from .scheduler import RequestScheduler, TokenBucket
+
+# max listings per batch request
+BATCH_SIZE = 100
+# more listings than this are cheaper to create again in one batch than to
+# update one by one
+MAX_LISTING_UPDATES = 10
+REQUEST_TIMEOUT = 30  # seconds to wait for a response once a request is sent
+# endpoint class -> (requests per second, burst)
+RATE_LIMITS = {
+    "users": (1.0, 5),
+    "batch": (10 / 60, 2),
+    "listings": (1.0, 10),
+    "agent": (1.0, 2),
+    "other": (1.0, 5),
+}
+
+
+def is_sell_listing_id(listing_id: str) -> bool:
+    # sell listings are 440_{asset_id}, buy listings 440_{steam_id}_{hash}
+    return listing_id.count("_") == 1
+
+
+def get_endpoint_class(endpoint: str) -> str:
+    if endpoint in ["/v2/classifieds/listings/batch", "/classifieds/delete/v1"]:
+        return "batch"
+
+    if endpoint.startswith("/v2/classifieds/listings"):
+        return "listings"
+
+    if endpoint.startswith("/users/"):
+        return "users"
+
+    if endpoint.startswith("/agent/"):
+        return "agent"
+
+    return "other"
+
+
+def get_request_lane(method: str, endpoint: str, data: dict | list | None) -> str:
+    if endpoint.startswith("/users/"):
+        return "ban_check"
+
+    is_sell = None
+
+    if endpoint == "/v2/classifieds/listings/batch":
+        is_sell = any("id" in listing for listing in data)
+
+    elif endpoint == "/classifieds/delete/v1":
+        is_sell = any(is_sell_listing_id(i) for i in data["listing_ids"])
+
+    elif endpoint == "/v2/classifieds/listings" and method == "POST":
+        is_sell = "id" in data
+
+    # deleting or updating a single listing
+    elif endpoint.startswith("/v2/classifieds/listings/") and method != "GET":
+        is_sell = is_sell_listing_id(endpoint.rsplit("/", 1)[1])
+
+    if is_sell is None:
+        return "other"
+
+    return "sell" if is_sell else "buy"
+
+
+class ExpressBackpackTF(BackpackTF):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+
+        self.scheduler = RequestScheduler(
+            {name: TokenBucket(*limit) for name, limit in RATE_LIMITS.items()}
+        )
+        # seconds a request may wait on the rate limits before it is given up
+        self.timeout: float | None = None
+
+    @needs_token
+    def _request(
+        self, method: str, endpoint: str, params: dict | None = None, **kwargs
+    ) -> dict:
+        params = (params or {}) | {"token": self._token}
+
+        if self._api_key:
+            params["key"] = self._api_key
+
+        lane = get_request_lane(method, endpoint, kwargs.get("json"))
+        response = self.scheduler.request(
+            lane,
+            get_endpoint_class(endpoint),
+            method,
+            self.URL + endpoint,
+            params=params,
+            headers=self._headers,
+            wait_timeout=self.timeout,
+            timeout=REQUEST_TIMEOUT,
+            **kwargs,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def create_listings(self, listings: list[dict]) -> list[Listing]:
+        to_list = [self._construct_listing(**listing) for listing in listings]
+        response = self._request("POST", "/v2/classifieds/listings/batch", json=to_list)
+        created = []
+
+        # failed listings have an error instead of a result
+        for listing in response:
+            if "result" not in listing:
+                logging.debug(f"Listing was not created: {listing}")
+                continue
+
+            created.append(Listing(**listing["result"]))
+
+        return created
+
+    def update_listing(self, listing_id: str, details: str) -> dict:
+        return self._request(
+            "PATCH", f"/v2/classifieds/listings/{listing_id}", json={"details": details}
+        )
+
+    def delete_listings(self, listing_ids: list[str]) -> dict:
+        return self._request(
+            "DELETE", "/classifieds/delete/v1", json={"listing_ids": listing_ids}
+        )
@@ -1,45 +1,84 @@
 from typing import Any
 
-from steam.protobufs.econ import Asset, ItemDescription
+from steam.protobufs.econ import (
+    Asset,
+    ItemAction,
+    ItemDescription,
+    ItemDescriptionLine,
+    ItemTag,
+)
 from steam.state import ConnectionState
 from steam.trade import Item, MovedItem
 from steam.user import User
 
+from .cache import LRUCache
 
-def item_data_to_item_object(
-    state: ConnectionState, owner: User, item_data: dict[str, Any]
-) -> Item:
-    # logging.debug(f"{item_data=}")
-    asset_item_data = {
-        "assetid": int(item_data["assetid"]),
-        "appid": int(item_data["appid"]),
-        "classid": int(item_data["classid"]),
-        "instanceid": int(item_data["instanceid"]),
-        "amount": int(item_data["amount"]),
-        "contextid": int(item_data["contextid"]),
-    }
-    description_item_data = {
-        "appid": int(item_data["appid"]),
-        "classid": int(item_data["classid"]),
-        "instanceid": int(item_data["instanceid"]),
-        "icon_url": item_data["icon_url"],
-        "descriptions": [i["value"] for i in item_data.get("descriptions", [])],
-        "tradable": item_data["tradable"],
-        "actions": item_data["actions"],
-        "name": item_data["name"],
-        "name_color": item_data["name_color"],
-        "market_name": item_data["market_name"],
-        "market_hash_name": item_data["market_hash_name"],
-    }
+DESCRIPTION_CACHE_SIZE = 4096
+# (appid, classid, instanceid) -> description, which is the same for every item
+# of that class
+_item_descriptions = LRUCache(DESCRIPTION_CACHE_SIZE)
+_description_data = LRUCache(DESCRIPTION_CACHE_SIZE)
 
-    asset = Asset(**asset_item_data)
-    description = ItemDescription(**description_item_data)
 
-    return Item(state=state, asset=asset, description=description, owner=owner)
+def get_item_description(item_data: dict[str, Any]) -> ItemDescription:
+    key = (
+        int(item_data["appid"]),
+        int(item_data["classid"]),
+        int(item_data["instanceid"]),
+    )
+    description = _item_descriptions.get(key)
 
+    if description is not None:
+        return description
 
-def item_object_to_item_data(item: Item) -> dict[str, Any]:
-    return item.to_dict() | {
+    description = ItemDescription(
+        appid=key[0],
+        classid=key[1],
+        instanceid=key[2],
+        icon_url=item_data["icon_url"],
+        descriptions=[
+            ItemDescriptionLine(
+                type=i.get("type", ""),
+                value=i["value"],
+                color=i.get("color", ""),
+                label=i.get("label", ""),
+            )
+            for i in item_data.get("descriptions", [])
+        ],
+        tradable=item_data["tradable"],
+        actions=[
+            ItemAction(link=i["link"], name=i["name"]) for i in item_data["actions"]
+        ],
+        tags=[
+            ItemTag(
+                appid=key[0],
+                category=i["category"],
+                internal_name=i["internal_name"],
+                localized_category_name=i["localized_category_name"],
+                localized_tag_name=i["localized_tag_name"],
+                color=i.get("color", ""),
+            )
+            for i in item_data.get("tags", [])
+        ],
+        name=item_data["name"],
+        name_color=item_data["name_color"],
+        market_name=item_data["market_name"],
+        market_hash_name=item_data["market_hash_name"],
+    )
+    _item_descriptions.set(key, description)
+
+    return description
+
+
+def get_description_data(item: Item) -> dict[str, Any]:
+    """Shared between items of the same class, do not change the lists"""
+    key = (int(item._app_id), item.class_id, item.instance_id)
+    data = _description_data.get(key)
+
+    if data is not None:
+        return data
+
+    data = {
         "appid": int(item._app_id),
         "classid": item.class_id,
         "instanceid": item.instance_id,
@@ -69,6 +108,32 @@ def item_object_to_item_data(item: Item) -> dict[str, Any]:
             for i in item.tags
         ],
     }
+    _description_data.set(key, data)
+
+    return data
+
+
+def item_data_to_item_object(
+    state: ConnectionState, owner: User, item_data: dict[str, Any]
+) -> Item:
+    # logging.debug(f"{item_data=}")
+    asset_item_data = {
+        "assetid": int(item_data["assetid"]),
+        "appid": int(item_data["appid"]),
+        "classid": int(item_data["classid"]),
+        "instanceid": int(item_data["instanceid"]),
+        "amount": int(item_data["amount"]),
+        "contextid": int(item_data["contextid"]),
+    }
+
+    asset = Asset(**asset_item_data)
+    description = get_item_description(item_data)
+
+    return Item(state=state, asset=asset, description=description, owner=owner)
+
+
+def item_object_to_item_data(item: Item) -> dict[str, Any]:
+    return item.to_dict() | get_description_data(item)
 
 
 def receipt_object_to_item_data(item: MovedItem) -> dict[str, Any]:
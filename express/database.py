@@ -3,7 +3,7 @@ import time
 from os import getenv
 from typing import Any
 
-from pymongo import MongoClient
+from pymongo import MongoClient, ReplaceOne, UpdateOne
 from tf2_utils import is_metal
 
 from .exceptions import SKUNotFound
@@ -20,6 +20,7 @@ class Database:
         self.trades = db["trades"]
         self.items = db["items"]
         self.arbitrage = db["arbitrage"]
+        self.listings = db["listings"]
 
         # bot needs key price to work
         if not self.get_item("5021;6"):
@@ -116,6 +117,12 @@ class Database:
     def get_pricelist(self) -> list[dict]:
         return list(self.items.find())
 
+    def get_items(self, skus: list[str]) -> list[dict]:
+        if not skus:
+            return []
+
+        return list(self.items.find({"sku": {"$in": skus}}, {"_id": 0}))
+
     def get_stock(self, sku: str) -> tuple[int, int]:
         """returns in_stock, max_stock"""
         data = self.get_item(sku)
@@ -150,6 +157,18 @@ class Database:
 
         logging.info("Updated stock for all items")
 
+    def update_item_stock(self, stock: dict[str, int]) -> None:
+        """Sets in_stock for only the given skus"""
+        if not stock:
+            return
+
+        operations = [
+            UpdateOne({"sku": sku}, {"$set": {"in_stock": in_stock}})
+            for sku, in_stock in stock.items()
+        ]
+        self.items.bulk_write(operations, ordered=False)
+        logging.debug(f"Updated stock for {len(stock)} items")
+
     def add_item(
         self,
         sku: str,
@@ -216,6 +235,29 @@ class Database:
         self.items.replace_one({"sku": sku}, data)
         logging.info(f"Updated price for {sku}")
 
+    def update_prices(self, prices: dict[str, dict]) -> None:
+        """Updates buy and sell prices for many items in a single bulk write"""
+        if not prices:
+            return
+
+        updated = time.time()
+        operations = [
+            UpdateOne(
+                {"sku": sku},
+                {
+                    "$set": {
+                        "buy": prices[sku]["buy"],
+                        "sell": prices[sku]["sell"],
+                        "updated": updated,
+                    }
+                },
+            )
+            for sku in prices
+        ]
+
+        self.items.bulk_write(operations, ordered=False)
+        logging.info(f"Updated prices for {len(prices)} items")
+
     def update_autoprice(self, data: dict) -> None:
         self.update_price(data["sku"], data["buy"], data["sell"])
 
@@ -234,3 +276,34 @@ class Database:
 
     def get_arbitrages(self) -> list[dict]:
         return list(self.arbitrage.find())
+
+    def get_listings(self) -> dict[str, dict]:
+        """returns listings by listing key"""
+        listings = {}
+
+        for listing in self.listings.find():
+            del listing["_id"]
+            listings[listing.pop("key")] = listing
+
+        return listings
+
+    def set_listings(self, listings: dict[str, dict]) -> None:
+        """Saves listings by listing key in a single bulk write"""
+        if not listings:
+            return
+
+        operations = [
+            ReplaceOne({"key": key}, {"key": key} | listing, upsert=True)
+            for key, listing in listings.items()
+        ]
+
+        self.listings.bulk_write(operations, ordered=False)
+
+    def delete_listings(self, keys: list[str]) -> None:
+        if not keys:
+            return
+
+        self.listings.delete_many({"key": {"$in": keys}})
+
+    def delete_all_listings(self) -> None:
+        self.listings.delete_many({})
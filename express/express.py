@@ -26,6 +26,7 @@ class Express(steam.Client):
         self.pending_site_offers = {}
         self.processed_offers = {}
         self.is_bot_ready = False
+        self._bot_ready = asyncio.Event()
 
         self.arbitrage_manager = None
         self.inventory_manager = None
@@ -70,8 +71,11 @@ class Express(steam.Client):
         # delete listings on exit and disconnect from websocket
         atexit.register(self.cleanup)
 
-        # set inventory
-        self.inventory_manager.fetch_our_inventory()
+        # set inventory, a snapshot lets us start before it is fetched
+        from_snapshot = self.inventory_manager.load_inventory_snapshot()
+
+        if not from_snapshot:
+            await self.inventory_manager.fetch_our_inventory()
 
         # get inventory stock and update database
         stock = self.inventory_manager.get_stock()
@@ -79,16 +83,27 @@ class Express(steam.Client):
 
         # we are now ready (other events can now fire)
         self.is_bot_ready = True
+        self._bot_ready.set()
 
         asyncio.create_task(self.pricing_manager.provider.listen())
+        asyncio.create_task(self.pricing_manager.process_price_updates())
         asyncio.create_task(self.pricing_manager.run())
 
+        if self.options.price_refresh_requests_per_minute > 0:
+            asyncio.create_task(self.pricing_manager.refresh_stale_prices())
+
         if self.options.use_backpack_tf:
             asyncio.create_task(self.listing_manager.run())
 
         if self.options.is_express_tf_bot:
             asyncio.create_task(self.ws_manager.listen())
 
+        if from_snapshot:
+            asyncio.create_task(self.inventory_manager.validate_inventory_snapshot())
+
+        if self.options.inventory_refresh_interval > 0:
+            asyncio.create_task(self.inventory_manager.run())
+
         if self.options.cancel_old_sent_offers:
             asyncio.create_task(self.trade_manager.run())
 
@@ -112,14 +127,15 @@ class Express(steam.Client):
             raise ExpressException("You need to set a model for AI chat responses")
 
     async def bot_is_ready(self) -> None:
-        while not self.is_bot_ready:
-            await asyncio.sleep(1)
+        await self._bot_ready.wait()
 
-    async def bot_is_ready_and_prices_updated(self) -> None:
+    async def bot_is_ready_and_prices_updated(
+        self, skus: list[str] | None = None
+    ) -> None:
         await self.bot_is_ready()
 
-        while not self.are_prices_updated:
-            await asyncio.sleep(1)
+        # keys are always needed to value items, other skus only if given
+        await self.pricing_manager.wait_for_prices(["5021;6", *(skus or [])])
 
     def add_offer_data(self, offer_id: int | str, offer_data: dict) -> None:
         if isinstance(offer_id, int):
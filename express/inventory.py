@@ -1,7 +1,358 @@
+import asyncio
+import json
 import logging
+import os
+import random
 import time
+from collections.abc import Mapping, ValuesView
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator
+
+import aiohttp
+from tf2_utils import (
+    InvalidInventory,
+    Inventory,
+    Item,
+    get_metal,
+    get_sku,
+    is_key,
+    is_metal,
+    is_pure,
+)
+from tf2_utils.providers.provider import Provider
+from tf2_utils.providers.steamcommunity import SteamCommunity
+
+FETCH_RETRIES = 5
+FETCH_TIMEOUT = 30  # seconds before an inventory request is given up
+# differs between items of the same classid and instanceid
+ASSET_KEYS = ("assetid", "amount", "sku")
+# set on items by CurrencyExchange while building an offer
+OFFER_KEYS = ("picked", "pure_value")
+SNAPSHOT_VERSION = 1
+MAP_CHUNK_SIZE = 500  # items mapped before other tasks get to run
+HEDGE_DELAY = 2.0  # seconds before the next provider is asked as well
+DEMOTE_AFTER_FAILURES = 3  # failures in a row before a provider is demoted
+DEMOTE_SECONDS = 300
+FETCH_ERRORS = (
+    InvalidInventory,
+    aiohttp.ClientError,
+    asyncio.TimeoutError,
+    ValueError,
+)
+
+
+@dataclass
+class PureLedger:
+    keys: int = 0
+    refined: int = 0
+    reclaimed: int = 0
+    scrap: int = 0
+
+    @property
+    def metal_scrap(self) -> int:
+        return self.refined * 9 + self.reclaimed * 3 + self.scrap
+
+    def get_total_scrap(self, key_scrap_price: int) -> int:
+        return self.keys * key_scrap_price + self.metal_scrap
+
+    def update(self, sku: str, amount: int = 1) -> None:
+        if is_key(sku):
+            self.keys += amount
+            return
+
+        if not is_metal(sku):
+            return
+
+        match get_metal(sku):
+            case 9:
+                self.refined += amount
+            case 3:
+                self.reclaimed += amount
+            case 1:
+                self.scrap += amount
+
+    def __sub__(self, other: "PureLedger") -> "PureLedger":
+        return PureLedger(
+            self.keys - other.keys,
+            self.refined - other.refined,
+            self.reclaimed - other.reclaimed,
+            self.scrap - other.scrap,
+        )
+
+
+@dataclass
+class ProviderStats:
+    requests: int = 0
+    failures: int = 0
+    failures_in_row: int = 0
+    latency: float = 0.0  # moving average of successful fetches in seconds
+    demoted_until: float = 0.0
+
+    def is_demoted(self) -> bool:
+        return self.demoted_until > time.monotonic()
+
+    def add_success(self, latency: float) -> None:
+        self.requests += 1
+        self.failures_in_row = 0
+        self.demoted_until = 0.0
+        self.latency = (
+            latency if not self.latency else self.latency * 0.8 + latency * 0.2
+        )
+
+    def add_unanswered(self, elapsed: float) -> None:
+        # lost a race, so it is at least this slow
+        self.latency = max(self.latency, elapsed)
+
+    def add_failure(self) -> None:
+        self.requests += 1
+        self.failures += 1
+        self.failures_in_row += 1
+
+        if self.failures_in_row >= DEMOTE_AFTER_FAILURES:
+            self.demoted_until = time.monotonic() + DEMOTE_SECONDS
+
+
+def get_provider(provider_name: str, api_key: str = "") -> Provider:
+    provider = Inventory(provider_name, api_key).provider
+
+    # tf2_utils uses steam community when it does not know what to use
+    if (
+        isinstance(provider, SteamCommunity)
+        and provider_name.lower() != "steamcommunity"
+    ):
+        if not api_key:
+            raise ValueError(f"Inventory provider {provider_name} needs an API key")
 
-from tf2_utils import InvalidInventory, Inventory, Item, get_sku, is_pure, map_inventory
+        raise ValueError(f"Unknown inventory provider: {provider_name}")
+
+    return provider
+
+
+def get_class_key(item: dict) -> tuple[int, int]:
+    return (int(item["classid"]), int(item["instanceid"]))
+
+
+def map_inventory_chunks(
+    inventory: dict, chunk_size: int = MAP_CHUNK_SIZE
+) -> Iterator[list[dict]]:
+    """Same items as `map_inventory(inventory, True, True)` from tf2_utils, but
+    descriptions are looked up by classid and instanceid instead of searched for
+    every asset, and every sku is only made once"""
+    if "assets" not in inventory:
+        raise InvalidInventory("No assets found in inventory")
+
+    descriptions = {}
+    skus = {}
+    chunk = []
+
+    for description in inventory.get("descriptions", []):
+        if description["tradable"]:
+            class_key = (description["classid"], description["instanceid"])
+            descriptions.setdefault(class_key, description)
+
+    for asset in inventory["assets"]:
+        class_key = (asset["classid"], asset["instanceid"])
+        description = descriptions.get(class_key)
+
+        if description is None:
+            continue
+
+        if class_key not in skus:
+            skus[class_key] = get_sku(description)
+
+        chunk.append({"sku": skus[class_key], **asset, **description})
+
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+def map_tradable_inventory(inventory: dict) -> list[dict]:
+    return [item for chunk in map_inventory_chunks(inventory) for item in chunk]
+
+
+async def map_tradable_inventory_async(inventory: dict) -> list[dict]:
+    """Lets other tasks run between chunks, so large inventories do not hold
+    up trades and chat"""
+    items = []
+
+    for chunk in map_inventory_chunks(inventory):
+        items += chunk
+        await asyncio.sleep(0)
+
+    return items
+
+
+class InventoryItem(Mapping):
+    """Read-only item. Only the asset id, amount and sku are kept per item, the
+    description is shared with items of the same classid and instanceid"""
+
+    __slots__ = ("assetid", "amount", "sku", "_description")
+
+    def __init__(self, item: Mapping, description: dict) -> None:
+        self.assetid = item["assetid"]
+        self.amount = item.get("amount")
+        self.sku = item["sku"]
+        self._description = description
+
+    def __getitem__(self, key: str) -> Any:
+        if key in ASSET_KEYS:
+            value = getattr(self, key)
+
+            if value is None:
+                raise KeyError(key)
+
+            return value
+
+        return self._description[key]
+
+    def __iter__(self) -> Iterator[str]:
+        for key in ASSET_KEYS:
+            if getattr(self, key) is not None:
+                yield key
+
+        yield from self._description
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"InventoryItem({self.to_dict()})"
+
+    def to_dict(self) -> dict:
+        """Mutable copy of the item"""
+        return dict(self)
+
+
+class IndexedInventory:
+    """Items indexed by asset id, sku and (classid, instanceid). Items keep the
+    order they were added in and are stored as read-only `InventoryItem`s"""
+
+    def __init__(self, items: list[dict] = []) -> None:
+        self._items: dict[str, InventoryItem] = {}
+        self._skus: dict[str, dict[str, InventoryItem]] = {}
+        self._classes: dict[tuple[int, int], dict[str, InventoryItem]] = {}
+        # (classid, instanceid) -> description shared by those items
+        self._descriptions: dict[tuple[int, int], dict] = {}
+
+        for item in items:
+            self.add(item)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[InventoryItem]:
+        return iter(self._items.values())
+
+    def __contains__(self, asset_id: str | int) -> bool:
+        return str(asset_id) in self._items
+
+    def values(self) -> ValuesView[InventoryItem]:
+        """Live view of the items, nothing is copied"""
+        return self._items.values()
+
+    def to_list(self) -> list[InventoryItem]:
+        return list(self._items.values())
+
+    def to_snapshot(self) -> dict:
+        """Every description once, and a row of asset id, amount, sku and
+        description index per item"""
+        indexes = {class_key: i for i, class_key in enumerate(self._descriptions)}
+        return {
+            "descriptions": list(self._descriptions.values()),
+            "items": [
+                [item.assetid, item.amount, item.sku, indexes[get_class_key(item)]]
+                for item in self._items.values()
+            ],
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot: dict) -> "IndexedInventory":
+        inventory = cls()
+        descriptions = snapshot["descriptions"]
+
+        for description in descriptions:
+            inventory._descriptions[get_class_key(description)] = description
+
+        for asset_id, amount, sku, index in snapshot["items"]:
+            item = {"assetid": asset_id, "amount": amount, "sku": sku}
+            inventory.add(descriptions[index] | item)
+
+        return inventory
+
+    def _get_description(self, item: Mapping) -> dict:
+        class_key = get_class_key(item)
+        description = self._descriptions.get(class_key)
+
+        if description is None:
+            description = {
+                key: value
+                for key, value in item.items()
+                if key not in ASSET_KEYS and key not in OFFER_KEYS
+            }
+            self._descriptions[class_key] = description
+
+        return description
+
+    def add(self, item: Mapping) -> None:
+        asset_id = str(item["assetid"])
+
+        if asset_id in self._items:
+            self.remove(self._items[asset_id])
+
+        item = InventoryItem(item, self._get_description(item))
+        self._items[asset_id] = item
+        self._skus.setdefault(item.sku, {})[asset_id] = item
+        self._classes.setdefault(get_class_key(item), {})[asset_id] = item
+
+    def remove(self, item: Mapping) -> None:
+        asset_id = str(item["assetid"])
+        item = self._items.pop(asset_id, None)
+
+        if item is None:
+            raise ValueError(f"Item {asset_id} is not in inventory")
+
+        class_key = get_class_key(item)
+
+        for index, key in [(self._skus, item.sku), (self._classes, class_key)]:
+            del index[key][asset_id]
+
+            if not index[key]:
+                del index[key]
+
+        # last item of its class
+        if class_key not in self._classes:
+            del self._descriptions[class_key]
+
+    def get(self, asset_id: str | int) -> InventoryItem | None:
+        return self._items.get(str(asset_id))
+
+    def get_by_sku(self, sku: str) -> list[InventoryItem]:
+        return list(self._skus.get(sku, {}).values())
+
+    def get_last(self, sku: str) -> InventoryItem | dict:
+        items = self._skus.get(sku)
+
+        if not items:
+            return {}
+
+        return next(reversed(items.values()))
+
+    def has_sku(self, sku: str) -> bool:
+        return sku in self._skus
+
+    def get_same_item(self, item: Mapping) -> InventoryItem | None:
+        """Returns an item with the same classid and instanceid"""
+        items = self._classes.get(get_class_key(item))
+
+        if not items:
+            return None
+
+        return next(iter(items.values()))
 
 
 class ExpressInventory(Inventory):
@@ -10,76 +361,364 @@ class ExpressInventory(Inventory):
         our_steam_id: str,
         provider_name: str = "steamcommunity",
         api_key: str = "",
+        providers: list[dict] = [],
+        hedge_delay: float = HEDGE_DELAY,
     ) -> None:
         self.steam_id = our_steam_id
-
+        self.provider_name = provider_name
+        # name -> provider, unmeasured ones are raced in this order
+        self.providers = {
+            i["provider"]: get_provider(i["provider"], i.get("api_key", ""))
+            for i in providers
+        }
+        self.hedge_delay = hedge_delay
+        self.provider_stats: dict[str, ProviderStats] = {}
+        self._our_items: IndexedInventory | None = None
+        self._their_items: IndexedInventory | None = None
+        # sku -> amount, kept in sync with our inventory
+        self._stock = {"-100;6": 0}
+        self._pure = PureLedger()
+        # offer id -> our pure items in that offer
+        self._reserved: dict[str, list[dict]] = {}
+        self._reserved_pure = PureLedger()
+        # counts changes to our inventory, to tell if it changed during a fetch
+        self.changes = 0
+
+        # the single provider falls back to steam community like it always did
         super().__init__(provider_name, api_key)
 
-    def _fetch_inventory(self, steam_id: str) -> list[dict] | None:
-        for i in range(5):
+    async def fetch_async(
+        self,
+        steam_id: str,
+        app_id: int = 440,
+        context_id: int = 2,
+        provider: Provider | None = None,
+    ) -> dict:
+        provider = provider or self.provider
+        url, params = provider.get_url_and_params(steam_id, app_id, context_id)
+        timeout = aiohttp.ClientTimeout(total=FETCH_TIMEOUT)
+
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with session.get(
+                url, params=params, headers=provider.headers
+            ) as response:
+                return await response.json(content_type=None)
+
+    def get_providers(self) -> list[tuple[str, Provider]]:
+        """Providers in the order they are asked, fastest first and demoted ones
+        last. Providers without a latency yet are asked first to measure them"""
+        providers = list(self.providers.items()) or [
+            (self.provider_name, self.provider)
+        ]
+
+        def get_order(provider: tuple[str, Provider]) -> tuple[bool, float]:
+            stats = self.get_provider_stats(provider[0])
+            return (stats.is_demoted(), stats.latency)
+
+        return sorted(providers, key=get_order)
+
+    def get_provider_stats(self, provider_name: str) -> ProviderStats:
+        return self.provider_stats.setdefault(provider_name, ProviderStats())
+
+    async def _fetch_from_provider(
+        self, provider_name: str, provider: Provider, steam_id: str
+    ) -> list[dict]:
+        stats = self.get_provider_stats(provider_name)
+        start = time.monotonic()
+
+        try:
+            inventory = await self.fetch_async(steam_id, provider=provider)
+
+            if not isinstance(inventory, dict):
+                raise InvalidInventory("Inventory response was empty")
+
+            items = await map_tradable_inventory_async(inventory)
+        except Exception as e:
+            stats.add_failure()
+
+            if stats.failures_in_row == DEMOTE_AFTER_FAILURES:
+                logging.warning(f"Inventory provider {provider_name} was demoted")
+
+            if isinstance(e, FETCH_ERRORS):
+                raise
+
+            # any failing provider is a miss, the others can still answer
+            logging.exception(f"Inventory provider {provider_name} failed")
+            raise InvalidInventory(f"Inventory provider {provider_name} failed") from e
+
+        stats.add_success(time.monotonic() - start)
+        return items
+
+    async def _race_providers(self, steam_id: str) -> list[dict]:
+        """Asks the next provider when the previous ones failed or did not
+        answer within `hedge_delay` seconds, the first inventory wins"""
+        providers = self.get_providers()
+        tasks = set()
+        # task -> (provider name, time asked)
+        started = {}
+        error = None
+
+        try:
+            while providers or tasks:
+                if providers:
+                    provider_name, provider = providers.pop(0)
+                    task = asyncio.create_task(
+                        self._fetch_from_provider(provider_name, provider, steam_id)
+                    )
+                    tasks.add(task)
+                    started[task] = (provider_name, time.monotonic())
+
+                done, tasks = await asyncio.wait(
+                    tasks,
+                    timeout=self.hedge_delay if providers else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+
+                for task in done:
+                    try:
+                        return task.result()
+                    except FETCH_ERRORS as e:
+                        error = e
+        finally:
+            for task in tasks:
+                task.cancel()
+                provider_name, start = started[task]
+                self.get_provider_stats(provider_name).add_unanswered(
+                    time.monotonic() - start
+                )
+
+        raise error
+
+    async def _fetch_inventory(self, steam_id: str) -> list[dict] | None:
+        for i in range(FETCH_RETRIES):
             try:
-                inventory = self.fetch(steam_id)
-                return map_inventory(inventory, add_skus=True, skip_untradable=True)
-            except InvalidInventory:
-                logging.debug(f"Failed to fetch inventory for {steam_id}. Retrying...")
-                time.sleep(2**i)
+                return await self._race_providers(steam_id)
+            except FETCH_ERRORS as e:
+                logging.debug(f"Failed to fetch inventory for {steam_id}: {e!r}")
+
+            if i < FETCH_RETRIES - 1:
+                # jitter so retries for many inventories are spread out
+                await asyncio.sleep(random.uniform(0, 2**i))
 
         logging.warning(f"Failed to fetch inventory for {steam_id}")
 
-    def set_our_inventory(self, inventory: list[dict]) -> list[dict]:
-        self.our_inventory = inventory
+    def _update_stock(self, item: dict, amount: int) -> None:
+        sku = item["sku"]
+
+        if Item(item).is_craft_hat():
+            self._stock["-100;6"] += amount
+
+        self._pure.update(sku, amount)
+        in_stock = self._stock.get(sku, 0) + amount
+
+        if in_stock > 0 or sku == "-100;6":
+            self._stock[sku] = in_stock
+        else:
+            self._stock.pop(sku, None)
+
+    def _set_stock(self) -> None:
+        self._stock = {"-100;6": 0}
+        self._pure = PureLedger()
+
+        for item in self._our_items:
+            self._update_stock(item, 1)
+
+    @property
+    def our_inventory(self) -> ValuesView[InventoryItem] | None:
+        """Read-only view of our items, use `to_dict` to get a copy of one"""
+        if self._our_items is None:
+            return None
+
+        return self._our_items.values()
+
+    @property
+    def their_inventory(self) -> ValuesView[InventoryItem] | None:
+        if self._their_items is None:
+            return None
+
+        return self._their_items.values()
+
+    def set_our_inventory(self, inventory: list[dict]) -> ValuesView[InventoryItem]:
+        self._our_items = IndexedInventory(inventory)
+        self._set_stock()
+        self.changes += 1
         return self.our_inventory
 
-    def fetch_our_inventory(self) -> list[dict]:
-        inventory = self._fetch_inventory(self.steam_id)
+    def update_our_inventory(self, inventory: list[dict]) -> set[str]:
+        """Makes our inventory match `inventory` by only adding and removing the
+        items which differ by asset id. Returns skus of those items"""
+        new_items = {str(item["assetid"]): item for item in inventory}
+        removed = [i for i in self._our_items if str(i["assetid"]) not in new_items]
+        added = [
+            i for asset_id, i in new_items.items() if asset_id not in self._our_items
+        ]
+        skus = {item["sku"] for item in removed + added}
+        craft_hats = self.get_in_stock("-100;6")
+
+        for item in removed:
+            self.remove_item(item)
+
+        for item in added:
+            self.add_item(item)
+
+        logging.debug(f"Inventory diff {len(added)=} {len(removed)=}")
+
+        if self.get_in_stock("-100;6") != craft_hats:
+            skus.add("-100;6")
+
+        return skus
+
+    def get_snapshot(self) -> dict:
+        """Our inventory as it is now. Descriptions are shared, but never
+        changed, so the snapshot can be written from another thread"""
+        return {
+            "version": SNAPSHOT_VERSION,
+            "steam_id": self.steam_id,
+            "saved_at": time.time(),
+            **self._our_items.to_snapshot(),
+        }
+
+    @staticmethod
+    def write_snapshot(snapshot: dict, path: Path) -> None:
+        """Writes a snapshot to `path` as compact json. The old file is only
+        replaced once the new one is written"""
+        temp_path = path.with_suffix(".tmp")
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        with open(temp_path, "w") as f:
+            json.dump(snapshot, f, separators=(",", ":"))
+
+        os.replace(temp_path, path)
+
+    def save_snapshot(self, path: Path) -> None:
+        self.write_snapshot(self.get_snapshot(), path)
+
+    def load_snapshot(self, path: Path) -> bool:
+        """Sets our inventory from a snapshot, returns False if there is no
+        usable one"""
+        try:
+            with open(path, "r") as f:
+                snapshot = json.load(f)
+
+            if snapshot["version"] != SNAPSHOT_VERSION:
+                return False
+
+            if snapshot["steam_id"] != self.steam_id:
+                return False
+
+            self._our_items = IndexedInventory.from_snapshot(snapshot)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, KeyError, TypeError, IndexError) as e:
+            logging.warning(f"Could not load inventory snapshot {path}: {e!r}")
+            return False
+
+        self._set_stock()
+        self.changes += 1
+        age = time.time() - snapshot["saved_at"]
+        logging.info(f"Loaded our inventory from a snapshot {age:.0f} seconds old")
+
+        return True
+
+    async def fetch_our_inventory(self) -> ValuesView[InventoryItem]:
+        inventory = await self._fetch_inventory(self.steam_id)
 
         assert inventory is not None, "Inventory could not be loaded"
-        self.our_inventory = inventory
+        self.set_our_inventory(inventory)
         logging.info("Fetched our inventory")
 
         return self.our_inventory
 
-    def fetch_their_inventory(self, steam_id: str) -> list[dict]:
-        self.their_inventory = self._fetch_inventory(steam_id)
+    async def fetch_their_inventory(self, steam_id: str) -> list[dict]:
+        inventory = await self._fetch_inventory(steam_id)
+        self._their_items = None if inventory is None else IndexedInventory(inventory)
+        return inventory
+
+    def get_our_inventory(self) -> ValuesView[InventoryItem]:
+        return self.our_inventory
+
+    def get_their_inventory(self) -> ValuesView[InventoryItem]:
         return self.their_inventory
 
-    def get_our_inventory(self) -> list[dict]:
-        return self.our_inventory.copy()
+    def get_our_item(self, asset_id: str | int) -> InventoryItem | None:
+        return self._our_items.get(asset_id)
 
-    def get_their_inventory(self) -> list[dict]:
-        return self.their_inventory.copy()
+    def get_same_item_in_our_inventory(self, item: dict) -> InventoryItem | None:
+        """Returns our item with the same asset id, or else the same classid and
+        instanceid"""
+        our_item = self._our_items.get(item["assetid"])
 
-    def get_stock(self) -> dict[str, int]:
-        stock = {"-100;6": 0}
+        if our_item is not None:
+            return our_item
 
-        if self.our_inventory is None:
+        return self._our_items.get_same_item(item)
+
+    def is_asset_id_in_our_inventory(self, asset_id: str | int) -> bool:
+        return asset_id in self._our_items
+
+    def get_stock(self) -> dict[str, int]:
+        if self._our_items is None:
             logging.warning("Inventory was not fetched")
-            return stock
 
-        for item in self.our_inventory:
-            item_util = Item(item)
-            sku = item["sku"]
+        return self._stock.copy()
+
+    def get_in_stock(self, sku: str) -> int:
+        return self._stock.get(sku, 0)
+
+    def get_pure(self) -> PureLedger:
+        """Pure we have which is not reserved by pending offers"""
+        return self._pure - self._reserved_pure
 
-            if item_util.is_craft_hat():
-                stock["-100;6"] += 1
+    def get_reserved_pure(self) -> PureLedger:
+        return PureLedger(**vars(self._reserved_pure))
 
-            if sku not in stock:
-                stock[sku] = 1
-            else:
-                stock[sku] += 1
+    def reserve_pure(self, offer_id: str, items: list[dict]) -> None:
+        pure_items = []
 
-        logging.debug(f"Stock: {stock}")
+        for item in items:
+            sku = item.get("sku") or get_sku(item)
 
-        return stock
+            if is_pure(sku):
+                pure_items.append(item | {"sku": sku})
+
+        if not pure_items or offer_id in self._reserved:
+            return
+
+        for item in pure_items:
+            self._reserved_pure.update(item["sku"])
+
+        self._reserved[offer_id] = pure_items
+        logging.debug(f"Reserved {len(pure_items)} pure items for offer {offer_id}")
+
+    def release_pure(self, offer_id: str) -> None:
+        pure_items = self._reserved.pop(offer_id, [])
+
+        for item in pure_items:
+            self._reserved_pure.update(item["sku"], -1)
+
+        if pure_items:
+            logging.debug(f"Released pure items for offer {offer_id}")
+
+    def get_unreserved_inventory(self) -> list[dict]:
+        """Copies of our items which are not in pending offers, the offer being
+        built can mark them"""
+        asset_ids = {
+            str(item["assetid"]) for items in self._reserved.values() for item in items
+        }
+        return [
+            item.to_dict()
+            for item in self._our_items
+            if str(item["assetid"]) not in asset_ids
+        ]
 
     def get_non_pure_items(self) -> list[str]:
         non_pure_items = []
 
-        if self.our_inventory is None:
+        if self._our_items is None:
             logging.warning("Inventory was not fetched")
             return non_pure_items
 
-        for item in self.our_inventory:
+        for item in self._our_items:
             sku = item["sku"]
 
             if not is_pure(sku):
@@ -90,13 +729,8 @@ class ExpressInventory(Inventory):
         return non_pure_items
 
     def has_sku_in_inventory(self, sku: str, who: str = "us") -> bool:
-        inventory = self.our_inventory if who == "us" else self.their_inventory
-
-        for item in inventory:
-            if item["sku"] == sku:
-                return True
-
-        return False
+        inventory = self._our_items if who == "us" else self._their_items
+        return inventory.has_sku(sku)
 
     def has_sku_in_their_inventory(self, sku: str) -> bool:
         return self.has_sku_in_inventory(sku, "them")
@@ -105,14 +739,8 @@ class ExpressInventory(Inventory):
         return self.has_sku_in_inventory(sku, "us")
 
     def get_last_item(self, sku: str, who: str = "us") -> dict:
-        inventory = self.our_inventory if who == "us" else self.their_inventory
-        last_item = {}
-
-        for item in inventory:
-            if item["sku"] == sku:
-                last_item = item
-
-        return last_item
+        inventory = self._our_items if who == "us" else self._their_items
+        return inventory.get_last(sku)
 
     def get_last_item_in_their_inventory(self, sku: str) -> dict:
         return self.get_last_item(sku, "them")
@@ -121,10 +749,17 @@ class ExpressInventory(Inventory):
         return self.get_last_item(sku, "us")
 
     def remove_item(self, item: dict) -> None:
-        self.our_inventory.remove(item)
+        self._our_items.remove(item)
+        self._update_stock(item, -1)
+        self.changes += 1
 
     def add_item(self, item: dict) -> None:
-        self.our_inventory.append(item)
+        if item["assetid"] in self._our_items:
+            self.remove_item(self._our_items.get(item["assetid"]))
+
+        self._our_items.add(item)
+        self._update_stock(item, 1)
+        self.changes += 1
 
 
 def get_non_pure_skus(items: list[dict]) -> list[str]:
@@ -1,5 +1,14 @@
+from dataclasses import dataclass, field
+
 from backpack_tf import Listing
-from tf2_utils import sku_to_defindex, sku_to_quality
+from tf2_sku import from_sku, to_sku
+from tf2_utils import to_scrap
+
+from .inventory import PureLedger
+from .options import BUY_LISTING_DETAILS, SELL_LISTING_DETAILS
+from .utils import has_buy_and_sell_price
+
+LISTING_DETAILS = {"buy": BUY_LISTING_DETAILS, "sell": SELL_LISTING_DETAILS}
 
 
 def get_listing_key(intent: str, sku: str) -> str:
@@ -23,6 +32,60 @@ def surpasses_max_stock(intent: str, in_stock: int, max_stock: int) -> bool:
     return max_stock != -1 and in_stock >= max_stock
 
 
+@dataclass
+class ListingSnapshot:
+    """Pricelist, stock and pure at one point in time, so many listings can be
+    built without reading them again"""
+
+    pricelist: dict[str, dict]
+    stock: dict[str, int]
+    pure: PureLedger
+    key_scrap_price: int | None  # None if keys are not priced
+    priced_skus: set[str] = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.priced_skus = {
+            sku for sku, item in self.pricelist.items() if has_buy_and_sell_price(item)
+        }
+
+    def get_in_stock(self, sku: str) -> int:
+        return self.stock.get(sku, 0)
+
+    def has_enough_pure(self, keys: int, metal: float) -> bool:
+        if self.key_scrap_price is None:
+            return False
+
+        scrap_total = self.pure.get_total_scrap(self.key_scrap_price)
+        return scrap_total >= keys * self.key_scrap_price + to_scrap(metal)
+
+
+def escape_format(value) -> str:
+    return str(value).replace("{", "{{").replace("}", "}}")
+
+
+class ListingTemplate:
+    """Listing details for one item with everything but the price and stock
+    filled in, so only those have to be formatted for each listing"""
+
+    def __init__(self, variables: dict) -> None:
+        self.variables = variables
+        static_variables = {
+            key: escape_format(value) for key, value in variables.items()
+        }
+        self._details = {
+            intent: template.format(
+                **static_variables, price="{price}", in_stock="{in_stock}"
+            )
+            for intent, template in LISTING_DETAILS.items()
+        }
+
+    def get_variables(self, price: str, in_stock: int) -> dict:
+        return self.variables | {"price": price, "in_stock": in_stock}
+
+    def get_details(self, intent: str, price: str, in_stock: int) -> str:
+        return self._details[intent].format(price=price, in_stock=in_stock)
+
+
 class ListingConstruct:
     def __init__(
         self,
@@ -51,24 +114,119 @@ class ListingConstruct:
         }
 
 
-def get_matching_listing(
-    listing_construct: ListingConstruct, listings: list[Listing]
-) -> Listing:
+def listing_item_to_sku(item: dict) -> str:
+    """Canonical SKU for the item of a Backpack.TF listing"""
+
+    def get_id(key: str) -> int:
+        return (item.get(key) or {}).get("id", -1)
+
+    def get_defindex(key: str) -> int:
+        # kits, fabricators, strangifiers and unusualifiers
+        return (item.get(key) or {}).get("defindex", -1)
+
+    return to_sku(
+        {
+            "defindex": item.get("defindex", -1),
+            "quality": get_id("quality"),
+            "effect": get_id("particle"),
+            "australium": item.get("australium", False),
+            "craftable": item.get("craftable", True),
+            "wear": get_id("wearTier"),
+            "skin": get_id("texture"),
+            "strange": get_id("elevatedQuality") == 11,
+            "killstreak_tier": item.get("killstreakTier") or -1,
+            "target_defindex": get_defindex("target"),
+            "festivized": item.get("festivized", False),
+            "craft_number": item.get("craftNumber") or -1,
+            "crate_number": item.get("crateSeries") or -1,
+            "output_defindex": get_defindex("output"),
+            "output_quality": get_id("outputQuality"),
+        }
+    )
+
+
+def get_construct_match_key(listing_construct: ListingConstruct) -> tuple[str, str]:
+    # sell listings are for a specific asset
+    if listing_construct.intent == "sell":
+        return ("sell", f"440_{listing_construct.asset_id}")
+
+    return ("buy", to_sku(from_sku(listing_construct.sku)))
+
+
+def index_listings(listings: list[Listing]) -> dict[tuple[str, str], Listing]:
+    """Indexes active listings the same way as `get_construct_match_key`"""
+    index = {}
+
     for listing in listings:
         if listing.status != "active":
             continue
 
-        sku = listing_construct.sku
+        if listing.intent == "sell":
+            index[("sell", listing.id)] = listing
+        else:
+            index[("buy", listing_item_to_sku(listing.item))] = listing
+
+    return index
+
 
-        if listing.item.get("defindex") != sku_to_defindex(sku):
+def get_matching_listing(
+    listing_construct: ListingConstruct, listings: dict[tuple[str, str], Listing]
+) -> Listing | None:
+    return listings.get(get_construct_match_key(listing_construct))
+
+
+def is_same_listing(listing_construct: ListingConstruct, listing: dict) -> bool:
+    return (
+        listing.get("currencies") == listing_construct.currencies
+        and listing.get("details") == listing_construct.details
+        and listing.get("asset_id", 0) == listing_construct.asset_id
+    )
+
+
+def is_details_change(listing_construct: ListingConstruct, listing: dict) -> bool:
+    """Only the details changed, e.g. stock, so the listing can be updated"""
+    return (
+        "id" in listing
+        and listing.get("currencies") == listing_construct.currencies
+        and listing.get("asset_id", 0) == listing_construct.asset_id
+    )
+
+
+def get_listing_changes(
+    desired: dict[str, ListingConstruct], current: dict[str, dict]
+) -> tuple[list[ListingConstruct], list[ListingConstruct], list[dict]]:
+    """Diffs the listings we want against the listings we have, both keyed by
+    listing key. Returns constructs to create, constructs whose listing only
+    needs new details and listings to delete"""
+    to_create = []
+    to_update = []
+    to_delete = []
+
+    for key, construct in desired.items():
+        listing = current.get(key)
+
+        if listing is None:
+            to_create.append(construct)
             continue
 
-        if listing.item.get("quality", {}).get("id") != sku_to_quality(sku):
+        if is_same_listing(construct, listing):
             continue
 
-        if listing.intent != listing_construct.intent:
+        if is_details_change(construct, listing):
+            to_update.append(construct)
             continue
 
-        return listing
+        # sell listing ids depend on the asset, so the old one has to go.
+        # other listings are overwritten by creating them again
+        asset_changed = listing.get("asset_id", 0) != construct.asset_id
+
+        if construct.intent == "sell" and asset_changed:
+            to_delete.append(listing)
+
+        to_create.append(construct)
+
+    for key, listing in current.items():
+        if key not in desired:
+            to_delete.append(listing)
 
-    return None
+    return to_create, to_update, to_delete
@@ -118,6 +118,7 @@ class ChatManager(BaseManager):
 
         logging.info(f"{message.author.name} wants to check price for {sku}")
 
+        await self.client.pricing_manager.wait_for_prices([sku])
         data = self.client.pricing_manager.get_item(sku)
 
         if not data:
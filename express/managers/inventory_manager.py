@@ -1,67 +1,190 @@
+import asyncio
 import logging
+from collections.abc import ValuesView
+from itertools import count
 
 from steam import MovedItem, TradeOfferReceipt
 from tf2_utils import get_sku
 
-from ..inventory import ExpressInventory
-from ..utils import is_same_item
+from ..cache import LRUCache
+from ..inventory import ExpressInventory, InventoryItem, get_class_key
+from ..utils import get_inventory_snapshot_file
 from .base_manager import BaseManager
 
 
 class InventoryManager(BaseManager, ExpressInventory):
+    partner_inventory_cache_size = 100
+    # steam rate limits inventory requests
+    min_refresh_interval = 60
+    snapshot_validate_attempts = 5
+    # seconds to wait before saving, changes meanwhile are saved together
+    snapshot_save_delay = 1.0
+
     def setup(self):
         ExpressInventory.__init__(
             self,
             self.client.steam_id,
             self.options.inventory_provider,
             self.options.inventory_api_key,
+            self.options.inventory_providers,
+            self.options.inventory_hedge_delay,
+        )
+        # steam id -> their inventory, a few offers in a row fetch it once
+        self._partner_inventories = LRUCache(
+            self.partner_inventory_cache_size, self.options.partner_inventory_ttl
         )
+        self._snapshot_file = get_inventory_snapshot_file(self.client.steam_id)
+        self._snapshot_changed = False
+        self._snapshot_task: asyncio.Task | None = None
+        # received items steam gave no new asset id, until the next refresh
+        self._placeholder_asset_ids = count(-1, -1)
 
     @staticmethod
-    def _get_new_asset_id(item: dict, moved_items: list[MovedItem]) -> int:
+    def _get_new_asset_ids(
+        moved_items: list[MovedItem],
+    ) -> dict[tuple[int, int], list[int]]:
+        new_asset_ids = {}
+
         for moved_item in moved_items:
-            moved = {
-                "instanceid": moved_item.instance_id,
-                "classid": moved_item.class_id,
-            }
+            key = (int(moved_item.class_id), int(moved_item.instance_id))
+            new_asset_ids.setdefault(key, []).append(int(moved_item.new_id))
 
-            if is_same_item(item, moved):
-                return int(moved_item.new_id)
+        return new_asset_ids
 
-        return -1
+    async def fetch_partner_inventory(self, steam_id: str) -> list[dict] | None:
+        """Their inventory, reused for `partner_inventory_ttl` seconds. Uses
+        our provider instead of setting up a new one for every offer"""
+        inventory = self._partner_inventories.get(steam_id)
 
-    def get_in_stock(self, sku: str) -> int:
-        stock = self.get_stock()
-        return stock.get(sku, 0)
+        if inventory is None:
+            inventory = await self._fetch_inventory(steam_id)
 
-    def get_inventory_instance(self) -> ExpressInventory:
-        return ExpressInventory(
-            str(self.client.user.id64),
-            self.options.inventory_provider,
-            self.options.inventory_api_key,
+            if inventory is not None and self.options.partner_inventory_ttl > 0:
+                self._partner_inventories.set(steam_id, inventory)
+        else:
+            logging.debug(f"Using cached inventory for {steam_id}")
+
+        # offers reorder the list and mark the items they pick
+        return None if inventory is None else [dict(i) for i in inventory]
+
+    def invalidate_partner_inventory(self, steam_id: str) -> None:
+        self._partner_inventories.pop(steam_id)
+
+    def save_inventory_snapshot(self) -> None:
+        """Saves our inventory in the background, a save already waiting or
+        being written also picks up this change"""
+        if not self.options.inventory_snapshot:
+            return
+
+        self._snapshot_changed = True
+
+        if self._snapshot_task is None or self._snapshot_task.done():
+            self._snapshot_task = asyncio.create_task(self._save_inventory_snapshot())
+
+    async def _save_inventory_snapshot(self) -> None:
+        while self._snapshot_changed:
+            await asyncio.sleep(self.snapshot_save_delay)
+
+            self._snapshot_changed = False
+            # built on the loop, only writing the file is done in a thread
+            snapshot = self.get_snapshot()
+
+            try:
+                await asyncio.to_thread(
+                    self.write_snapshot, snapshot, self._snapshot_file
+                )
+            except OSError as e:
+                logging.warning(f"Could not save inventory snapshot: {e!r}")
+
+    def load_inventory_snapshot(self) -> bool:
+        if not self.options.inventory_snapshot:
+            return False
+
+        return self.load_snapshot(self._snapshot_file)
+
+    async def fetch_our_inventory(self) -> ValuesView[InventoryItem]:
+        inventory = await super().fetch_our_inventory()
+        self.save_inventory_snapshot()
+        return inventory
+
+    async def refresh_our_inventory(self) -> set[str] | None:
+        """Fetches our inventory and applies the difference, returns skus which
+        changed or None if the fetch could not be applied"""
+        changes = self.changes
+        inventory = await self._fetch_inventory(self.steam_id)
+
+        if inventory is None:
+            return None
+
+        # a trade was processed meanwhile, this fetch might not include it
+        if changes != self.changes:
+            logging.debug("Inventory changed during refresh, trying again later")
+            return None
+
+        skus = self.update_our_inventory(inventory)
+
+        if not skus:
+            return skus
+
+        logging.info(f"Inventory refresh changed stock for {len(skus)} items")
+        self.save_inventory_snapshot()
+        self.database.update_item_stock({sku: self.get_in_stock(sku) for sku in skus})
+
+        if self.options.use_backpack_tf:
+            self.client.listing_manager.set_inventory_changed(skus)
+
+        return skus
+
+    async def run(self) -> None:
+        interval = max(
+            self.options.inventory_refresh_interval, self.min_refresh_interval
         )
 
+        while True:
+            await asyncio.sleep(interval)
+            logging.debug("Refreshing our inventory...")
+            await self.refresh_our_inventory()
+
+    async def validate_inventory_snapshot(self) -> None:
+        """Fetches our inventory after starting from a snapshot, until the
+        difference could be applied"""
+        for i in range(self.snapshot_validate_attempts):
+            if i > 0:
+                await asyncio.sleep(self.min_refresh_interval)
+
+            if await self.refresh_our_inventory() is not None:
+                logging.info("Inventory snapshot was validated")
+                return
+
+        logging.warning("Could not validate inventory snapshot")
+
     async def update_inventory_with_receipt(
         self, their_items: list[dict], our_items: list[dict], receipt: TradeOfferReceipt
     ) -> None:
         logging.debug(f"{receipt=}")
-        updated_inventory = self.our_inventory.copy()
 
+        # update inventory and stock in place instead of rebuilding them
         for item in our_items:
-            for old_item in updated_inventory.copy():
-                if not is_same_item(item, old_item):
-                    continue
+            old_item = self.get_same_item_in_our_inventory(item)
 
-                logging.debug(f"{old_item=}")
+            if old_item is None:
+                continue
 
-                index = updated_inventory.index(old_item)
-                del updated_inventory[index]
+            logging.debug(f"{old_item=}")
+            self.remove_item(old_item)
+            logging.debug("removed from inventory")
 
-                logging.debug(f"removed from inventory {index=}")
-                break
+        new_asset_ids = self._get_new_asset_ids(receipt.received)
 
         for item in their_items:
-            asset_id = self._get_new_asset_id(item, receipt.received)
+            # every received item gets its own new asset id
+            asset_ids = new_asset_ids.get(get_class_key(item))
+            asset_id = asset_ids.pop(0) if asset_ids else -1
+
+            # items are indexed by asset id, so every item needs its own
+            if asset_id == -1:
+                asset_id = next(self._placeholder_asset_ids)
+
             sku = get_sku(item)
 
             logging.debug(f"{item=}")
@@ -71,12 +194,26 @@ class InventoryManager(BaseManager, ExpressInventory):
             item["sku"] = get_sku(item)
             item["assetid"] = str(asset_id)
 
-            updated_inventory.append(item)
-
-        self.set_our_inventory(updated_inventory)
+            self.add_item(item)
 
         logging.info("Our inventory was updated")
+        self.save_inventory_snapshot()
+
+        # notify listing manager stock has changed for these items
+        if self.options.use_backpack_tf:
+            skus = {get_sku(item) for item in our_items} | {
+                item["sku"] for item in their_items
+            }
+            self.client.listing_manager.set_inventory_changed(skus)
+
+    def reserve_pure(self, offer_id: str, items: list[dict]) -> None:
+        super().reserve_pure(offer_id, items)
+
+        if self.options.use_backpack_tf:
+            self.client.listing_manager.set_pure_changed()
+
+    def release_pure(self, offer_id: str) -> None:
+        super().release_pure(offer_id)
 
-        # notify listing manager inventory has changed (stock needs to be updated)
         if self.options.use_backpack_tf:
-            self.client.listing_manager.set_inventory_changed()
+            self.client.listing_manager.set_pure_changed()
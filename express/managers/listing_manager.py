@@ -1,48 +1,72 @@
 import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import asdict
+from functools import partial
+from typing import Any, Callable
 
-from backpack_tf import BackpackTF, Listing
-from tf2_utils import (
-    get_metal,
-    get_sku,
-    is_key,
-    is_metal,
-    is_pure,
-    to_scrap,
-)
+import requests
+from backpack_tf import Listing
+from tf2_utils import is_metal, is_pure
 
-from ..exceptions import ListingDoesNotExist
+from ..backpack_tf import BATCH_SIZE, MAX_LISTING_UPDATES, ExpressBackpackTF
+from ..exceptions import NoKeyPrice
 from ..listing import (
     ListingConstruct,
+    ListingSnapshot,
+    ListingTemplate,
+    get_listing_changes,
     get_listing_key,
     get_matching_listing,
     has_enough_stock,
+    index_listings,
     surpasses_max_stock,
 )
-from ..options import BUY_LISTING_DETAILS, SELL_LISTING_DETAILS
-from ..utils import has_buy_and_sell_price, has_correct_price_format
+from ..utils import (
+    has_correct_price_format,
+    normalize_item_name,
+)
 from .base_manager import BaseManager
 
 
 class ListingManager(BaseManager):
     def setup(self) -> None:
-        self.can_list = False
         self._listings = {}
-        self._has_updated_listings = True
-        self._is_ready = False
+        self._ready = asyncio.Event()
+
+        # skus which listings need to be reconciled, None means all
+        self._dirty_skus: set[str] | None = set()
+        self._pure_changed = False
+        # skus not listed for buying because we lacked pure
+        self._waiting_for_pure: set[str] = set()
+        self._has_changes = asyncio.Event()
+        self._reconcile_lock = asyncio.Lock()
+        # sku -> listing details with only price and stock left to fill in
+        self._templates: dict[str, ListingTemplate] = {}
+
+        # backpack.tf client is blocking, keep it off the event loop
+        self._executor = ThreadPoolExecutor(
+            max_workers=4, thread_name_prefix="backpack_tf"
+        )
 
-        self.backpack_tf = BackpackTF(
+        self.backpack_tf = ExpressBackpackTF(
             token=self.options.backpack_tf_token,
             steam_id=self.client.steam_id,
             api_key=self.options.backpack_tf_api_key,
             user_agent=self.options.backpack_tf_user_agent,
         )
+        self.backpack_tf.timeout = self.options.backpack_tf_timeout
         self.backpack_tf._library = "tf2-express"
 
     async def wait_until_ready(self) -> None:
-        while not self._is_ready:
-            await asyncio.sleep(0.1)
+        await self._ready.wait()
+
+    async def _run_in_thread(self, func: Callable, *args) -> Any:
+        """Runs a blocking Backpack.TF call in our thread pool. Requests which
+        could not be sent within `backpack_tf_timeout` seconds are cancelled and
+        raise TimeoutError, so they never change listings later"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args))
 
     def set_user_agent(self) -> bool:
         user_agent = self.backpack_tf.register_user_agent()
@@ -55,20 +79,58 @@ class ListingManager(BaseManager):
         logging.info("Backpack.TF user agent is now active")
         return True
 
-    def set_inventory_changed(self) -> None:
-        logging.debug("Inventory changed")
-        self._has_updated_listings = False
+    def _set_dirty(self, skus: set[str] | None) -> None:
+        if skus is None:
+            self._dirty_skus = None
+        elif self._dirty_skus is not None:
+            self._dirty_skus |= skus
+
+        self._has_changes.set()
+
+    def set_inventory_changed(self, skus: set[str] | None = None) -> None:
+        """`skus` which stock changed, or None if unknown"""
+        logging.debug(f"Inventory changed {skus=}")
+
+        if skus is None or any(is_pure(sku) for sku in skus):
+            self._pure_changed = True
+
+        self._set_dirty(skus)
+
+    def set_pure_changed(self) -> None:
+        self._pure_changed = True
+        self._set_dirty(set())
 
     def set_price_changed(self, sku: str) -> None:
         logging.debug(f"Updating listing for {sku}...")
+        self._set_dirty({sku})
+
+    def _get_pure_affected_skus(self) -> set[str]:
+        """Buy listings which could appear or disappear with our current pure"""
+        skus = set(self._waiting_for_pure)
+        snapshot = self.get_snapshot(set())
+
+        for listing in self._listings.values():
+            if listing["intent"] != "buy":
+                continue
+
+            currencies = listing["currencies"]
+
+            if not snapshot.has_enough_pure(currencies["keys"], currencies["metal"]):
+                skus.add(listing["sku"])
+
+        return skus
+
+    def _pop_dirty_skus(self) -> set[str] | None:
+        skus = self._dirty_skus
+        self._dirty_skus = set()
 
-        for intent in ["buy", "sell"]:
-            if self.is_listed(sku, intent):
-                self.delete_listing(sku, intent)
+        if self._pure_changed and skus is not None:
+            skus |= self._get_pure_affected_skus()
 
-            self.create_listing(sku, intent)
+        self._pure_changed = False
+        return skus
 
-    def set_listing(self, listing: Listing, construct: ListingConstruct) -> None:
+    def set_listing(self, listing: Listing, construct: ListingConstruct) -> str:
         listing_key = get_listing_key(construct.intent, construct.sku)
         listing_data = (
             asdict(listing) | construct.listing | construct.listings_variables
@@ -82,151 +144,106 @@ class ListingManager(BaseManager):
 
         intent = construct.intent.capitalize()
         logging.info(f"{intent} listing was created for {construct.sku}")
+        return listing_key
 
-    def is_backpack_tf_banned(self, steam_id: str | int) -> bool:
-        return self.options.check_backpack_tf_bans and self.backpack_tf.is_banned(
-            steam_id
-        )
+    async def _save_listings(self, keys: list[str]) -> None:
+        """Writes our listings for `keys` to the database in one go, off the
+        event loop"""
+        if not self.options.persist_listings or not keys:
+            return
+
+        listings = {key: self._listings[key] for key in keys}
+        await asyncio.to_thread(self.database.set_listings, listings)
+
+    async def is_backpack_tf_banned(self, steam_id: str | int) -> bool:
+        if not self.options.check_backpack_tf_bans:
+            return False
+
+        try:
+            return await self._run_in_thread(self.backpack_tf.is_banned, steam_id)
+        except (asyncio.TimeoutError, requests.RequestException) as e:
+            logging.warning(f"Could not check Backpack.TF bans for {steam_id}: {e}")
+            return False
+
+    def _get_listing_template(self, item: dict) -> ListingTemplate:
+        sku = item["sku"]
+        max_stock = item.get("max_stock", -1)
+        template = self._templates.get(sku)
+
+        if template is not None and template.variables["max_stock"] == max_stock:
+            return template
 
-    def _get_listing_variables(self, sku: str, currencies: dict) -> dict:
         formatted_identifier = sku.replace(";", "_")
 
         if not self.options.sku_in_listing_details:
-            formatted_identifier = self.database.get_normalized_item_name(sku)
+            formatted_identifier = normalize_item_name(item["name"])
 
-        keys = currencies["keys"]
-        metal = currencies["metal"]
-        max_stock = self.database.get_max_stock(sku)
-        in_stock = self.inventory_manager.get_in_stock(sku)
         max_stock_string = str(max_stock)
 
         if max_stock == -1:
             max_stock_string = "∞"
 
-        price = f"{metal} ref"
-
-        if keys > 0:
-            price = f"{keys} keys {metal} ref"
-
-        variables = {
-            "sku": sku,
-            "in_stock": in_stock,
-            "max_stock": max_stock,
-            "formatted_identifier": formatted_identifier,
-            "price": price,
-            "max_stock_string": max_stock_string,
-        }
+        template = ListingTemplate(
+            {
+                "sku": sku,
+                "max_stock": max_stock,
+                "formatted_identifier": formatted_identifier,
+                "max_stock_string": max_stock_string,
+            }
+        )
+        self._templates[sku] = template
 
-        logging.debug(f"Listing variables: {variables}")
-        return variables
+        return template
 
-    def get_listing_details(self, sku: str, intent: str, currencies: dict) -> str:
-        variables = self._get_listing_variables(sku, currencies)
+    def _get_asset_id_for_sku(self, sku: str) -> int:
+        listing = self._listings.get(get_listing_key("sell", sku), {})
+        asset_id = listing.get("asset_id", 0)
 
-        return (
-            BUY_LISTING_DETAILS.format(**variables)
-            if intent == "buy"
-            else SELL_LISTING_DETAILS.format(**variables)
-        )
+        # keep listing the same item as long as we have it
+        if asset_id and self._is_asset_id_in_inventory(asset_id):
+            return asset_id
 
-    def _get_asset_id_for_sku(self, sku: str) -> int:
         asset_id = self.inventory_manager.get_last_item_in_our_inventory(sku)["assetid"]
         return int(asset_id)
 
     def _is_asset_id_in_inventory(self, asset_id: str | int) -> bool:
-        if isinstance(asset_id, int):
-            asset_id = str(asset_id)
-
-        for item in self.inventory_manager.get_our_inventory():
-            if item["assetid"] == asset_id:
-                return True
-
-        return False
-
-    def _update_listing(self, listing: dict) -> None:
-        logging.debug(f"Updating listing {listing=}")
-
-        sku = listing["sku"]
-        intent = listing["intent"]
-        stock = self.inventory_manager.get_stock()
-        in_stock = stock.get(sku, 0)
-        max_stock = listing["max_stock"]
-
-        # nothing to update
-        if in_stock == listing["in_stock"]:
-            return
-
-        keys = int(listing.get("keys", 0))
-        metal = float(listing.get("metal", 0.0))
-
-        # not enough pure anymore
-        if intent == "buy" and not self.has_enough_pure(keys, metal):
-            self.delete_listing(sku, intent)
-            return
-
-        # we dont have the item anymore
-        if not has_enough_stock(intent, in_stock):
-            self.delete_listing(sku, intent)
-            return
-
-        # remove listing if max stock has been reached
-        if surpasses_max_stock(intent, in_stock, max_stock):
-            self.delete_listing(sku, intent)
-            return
-
-        asset_id = listing.get("asset_id", 0)
-
-        if intent == "sell" and not self._is_asset_id_in_inventory(asset_id):
-            self.delete_listing(sku, intent)
-            self.create_listing(sku, intent)
-            return
-
-        # stock was most likely changed
-        self.create_listing(sku, intent)
-
-    def is_listed(self, sku: str, intent: str) -> bool:
-        key = get_listing_key(intent, sku)
-        return key in self._listings
-
-    def has_enough_pure(self, keys: int, metal: float) -> bool:
-        inventory = self.inventory_manager.get_our_inventory()
-        keys_amount = 0
-        scrap_amount = 0
-
-        for i in inventory:
-            sku = get_sku(i)
-
-            if is_key(sku):
-                keys_amount += 1
-                continue
+        return self.inventory_manager.is_asset_id_in_our_inventory(asset_id)
 
-            if is_pure(sku):
-                scrap_amount += get_metal(sku)
-                continue
-
-        key_scrap_price = self.client.pricing_manager.get_key_scrap_price("buy")
-        scrap_total = keys_amount * key_scrap_price + scrap_amount
-
-        return scrap_total >= keys * key_scrap_price + to_scrap(metal)
-
-    def get_priced_skus(self) -> list[str]:
-        pricelist = self.database.get_pricelist()
-        return [item["sku"] for item in pricelist if has_buy_and_sell_price(item)]
+    def get_snapshot(self, skus: set[str] | None = None) -> ListingSnapshot:
+        """Reads prices for `skus`, or the whole pricelist if not given, and
+        our current stock and pure"""
+        if skus is None:
+            pricelist = self.database.get_pricelist()
+        else:
+            pricelist = self.database.get_items(list(skus))
+
+        try:
+            key_scrap_price = self.client.pricing_manager.get_key_scrap_price("buy")
+        except NoKeyPrice:
+            key_scrap_price = None
+
+        return ListingSnapshot(
+            {item["sku"]: item for item in pricelist},
+            self.inventory_manager.get_stock(),
+            self.inventory_manager.get_pure(),
+            key_scrap_price,
+        )
 
-    def create_listing_construct(
-        self, sku: str, intent: str
+    def build_listing_construct(
+        self, sku: str, intent: str, snapshot: ListingSnapshot | None = None
     ) -> ListingConstruct | None:
+        """Returns the listing we want to have for `sku` and `intent`, or None
+        if it should not be listed"""
         logging.debug(f"Creating construct for listing {intent=} {sku=}")
 
         # listing random craft hats and weps not supported yet
         if sku in ["-50;6", "-100;6"]:
             return
 
-        if self.is_listed(sku, intent):
-            logging.debug(f"{intent} listing for {sku} already exists")
-            return
+        if snapshot is None:
+            snapshot = self.get_snapshot({sku})
 
-        item = self.database.get_item(sku)
+        item = snapshot.pricelist.get(sku, {})
         assert has_correct_price_format(item), f"Item has wrong price format: {item}"
 
         currencies = item[intent]
@@ -237,9 +254,9 @@ class ListingManager(BaseManager):
             "metal": metal,
         }
 
-        listing_variables = self._get_listing_variables(sku, currencies)
-        in_stock = listing_variables["in_stock"]
-        max_stock = listing_variables["max_stock"]
+        in_stock = snapshot.get_in_stock(sku)
+        template = self._get_listing_template(item)
+        max_stock = template.variables["max_stock"]
 
         if not has_enough_stock(intent, in_stock):
             logging.debug(f"Not enough stock for {sku} to create a sell listing")
@@ -249,17 +266,28 @@ class ListingManager(BaseManager):
             logging.debug(f"Max stock reached for {sku} to create a buy listing")
             return
 
-        if intent == "buy" and not self.has_enough_pure(keys, metal):
+        if intent == "buy" and not snapshot.has_enough_pure(keys, metal):
             logging.debug(f"Not enough pure for {sku} to create a buy listing")
+            self._waiting_for_pure.add(sku)
             return
 
+        if intent == "buy":
+            self._waiting_for_pure.discard(sku)
+
         asset_id = 0
 
         if intent == "sell":
             asset_id = self._get_asset_id_for_sku(sku)
             logging.debug(f"Asset ID for {sku} is {asset_id}")
 
-        details = self.get_listing_details(sku, intent, currencies)
+        price = f"{metal} ref"
+
+        if keys > 0:
+            price = f"{keys} keys {metal} ref"
+
+        listing_variables = template.get_variables(price, in_stock)
+        details = template.get_details(intent, price, in_stock)
+        logging.debug(f"Listing variables: {listing_variables}")
         logging.debug(f"creating listing {sku=} {intent=} {currencies=} {asset_id=}")
         logging.debug(f"{details=}")
 
@@ -267,149 +295,266 @@ class ListingManager(BaseManager):
             sku, intent, currencies, details, asset_id, listing_variables
         )
 
-    def create_sell_constructs(self) -> list[ListingConstruct]:
-        logging.debug("Collecting data for sell listings...")
+    async def _create_listings(self, constructs: list[ListingConstruct]) -> int:
+        created_listings = 0
+        # sell listings go first, batches are filled up to the max size
+        constructs = sorted(constructs, key=lambda i: i.intent != "sell")
+
+        for i in range(0, len(constructs), BATCH_SIZE):
+            batch = constructs[i : i + BATCH_SIZE]
+
+            try:
+                listings_created = await self._run_in_thread(
+                    self.backpack_tf.create_listings,
+                    [construct.listing for construct in batch],
+                )
+            except (asyncio.TimeoutError, requests.RequestException) as e:
+                logging.warning(f"Could not create {len(batch)} listings: {e}")
+                continue
 
-        listings = []
-        skus = self.get_priced_skus()
+            logging.debug(f"{[asdict(i) for i in listings_created]}")
+            created = index_listings(listings_created)
+            keys = []
 
-        # first list the items we have in our inventory
-        for item in self.inventory_manager.get_our_inventory():
-            sku = get_sku(item)
+            for construct in batch:
+                sku = construct.sku
+                intent = construct.intent
+                listing = get_matching_listing(construct, created)
 
-            # we dont care about metal
-            if is_metal(sku):
-                continue
+                # probably not enough pure, so listing is not active
+                if listing is None:
+                    logging.debug(f"No matching listing found for {intent} {sku}")
+                    continue
 
-            # item has to be priced
-            if sku not in skus:
-                logging.debug(f"{sku} does not have both buy and sell price")
-                continue
+                keys.append(self.set_listing(listing, construct))
+                created_listings += 1
 
-            data = self.create_listing_construct(sku, "sell")
+            await self._save_listings(keys)
 
-            if data is None:
-                continue
+        return created_listings
 
-            listings.append(data)
+    async def _update_listing(self, construct: ListingConstruct) -> bool:
+        key = get_listing_key(construct.intent, construct.sku)
+        listing = self._listings[key]
 
-        return listings
+        try:
+            await self._run_in_thread(
+                self.backpack_tf.update_listing, listing["id"], construct.details
+            )
+        except (asyncio.TimeoutError, requests.RequestException) as e:
+            logging.warning(f"Could not update listing {listing['id']}: {e}")
+            return False
 
-    def create_buy_constructs(self) -> list[ListingConstruct]:
-        logging.debug("Collecting data for buy listings...")
+        listing_data = (
+            listing | {"details": construct.details} | construct.listings_variables
+        )
+        self._listings[key] = listing_data
 
-        skus = self.get_priced_skus()
-        listings = []
+        intent = construct.intent.capitalize()
+        logging.info(f"{intent} listing was updated for {construct.sku}")
+        return True
 
-        for sku in skus:
-            data = self.create_listing_construct(sku, "buy")
+    async def _update_listings(
+        self, constructs: list[ListingConstruct]
+    ) -> list[ListingConstruct]:
+        """Updates the details of listings in place, returns the constructs
+        whose listing could not be updated"""
+        updated = await asyncio.gather(*map(self._update_listing, constructs))
+        await self._save_listings(
+            [
+                get_listing_key(i.intent, i.sku)
+                for i, is_updated in zip(constructs, updated)
+                if is_updated
+            ]
+        )
+        return [i for i, is_updated in zip(constructs, updated) if not is_updated]
+
+    async def _delete_listings(self, listings: list[dict]) -> None:
+        listings = sorted(listings, key=lambda i: i["intent"] != "sell")
 
-            if data is None:
+        for i in range(0, len(listings), BATCH_SIZE):
+            batch = listings[i : i + BATCH_SIZE]
+
+            try:
+                response = await self._run_in_thread(
+                    self.backpack_tf.delete_listings, [j["id"] for j in batch]
+                )
+            except (asyncio.TimeoutError, requests.RequestException) as e:
+                logging.warning(f"Could not delete {len(batch)} listings: {e}")
                 continue
 
-            listings.append(data)
+            logging.debug(f"Deleted listings {response=}")
+            keys = []
 
-        return listings
+            for listing in batch:
+                key = get_listing_key(listing["intent"], listing["sku"])
+                self._listings.pop(key, None)
+                keys.append(key)
 
-    def create_listing(self, sku: str, intent: str) -> bool:
-        data = self.create_listing_construct(sku, intent)
+                intent = listing["intent"].capitalize()
+                logging.info(f"{intent} listing was deleted for {listing['sku']}")
 
-        if data is None:
-            return False
+            if self.options.persist_listings:
+                await asyncio.to_thread(self.database.delete_listings, keys)
 
-        listing = self.backpack_tf.create_listing(**data.listing)
-        logging.debug(f"{asdict(listing)}")
+    def get_desired_listings(
+        self, skus: set[str], snapshot: ListingSnapshot
+    ) -> dict[str, ListingConstruct]:
+        desired = {}
 
-        if listing.id:
-            self.set_listing(listing, data)
+        for sku in skus:
+            # we dont care about metal
+            if sku not in snapshot.priced_skus or is_metal(sku):
+                continue
 
-            logging.info(f"{intent.capitalize()} listing was created for {sku}")
-            return True
+            for intent in ["buy", "sell"]:
+                construct = self.build_listing_construct(sku, intent, snapshot)
 
-        return False
+                if construct is None:
+                    continue
 
-    def create_listings(self) -> None:
-        logging.info("Creating listings...")
+                desired[get_listing_key(intent, sku)] = construct
 
-        created_listings = 0
-        listings = self.create_sell_constructs() + self.create_buy_constructs()
+        return desired
+
+    async def reconcile_listings(self, skus: set[str] | None = None) -> None:
+        """Brings listings for `skus`, or every priced and listed item if not
+        given, in line with our prices, stock and pure. Only listings which
+        changed are created or deleted"""
+        # diffs have to be made against listings which are done changing
+        async with self._reconcile_lock:
+            await self._reconcile_listings(skus)
+
+    async def _reconcile_listings(self, skus: set[str] | None) -> None:
+        # prices, stock and pure are read once for every listing
+        snapshot = self.get_snapshot(skus)
+
+        if skus is None:
+            skus = set(snapshot.priced_skus)
+            skus |= {listing["sku"] for listing in self._listings.values()}
+
+        desired = self.get_desired_listings(skus, snapshot)
+        current = {
+            key: listing
+            for key, listing in self._listings.items()
+            if listing["sku"] in skus
+        }
+        to_create, to_update, to_delete = get_listing_changes(desired, current)
 
-        listings_created = self.backpack_tf.create_listings(
-            [i.listing for i in listings]
+        if not to_create and not to_update and not to_delete:
+            logging.debug("Listings are up to date")
+            return
+
+        logging.debug(
+            f"Reconciling {len(to_create)=} {len(to_update)=} {len(to_delete)=}"
         )
-        logging.debug(f"{[asdict(i) for i in listings_created]}")
 
-        for construct in listings:
-            sku = construct.sku
-            intent = construct.intent
-            listing = get_matching_listing(construct, listings_created)
+        # delete first, a sell listing can be deleted and created under same key
+        if to_delete:
+            await self._delete_listings(to_delete)
 
-            # probably not enough pure, so listing is not active
-            if listing is None:
-                logging.debug(f"No matching listing found for {intent} {sku}")
-                continue
+        # listings which could not be updated are created again instead
+        if len(to_update) > MAX_LISTING_UPDATES:
+            to_create += to_update
+        elif to_update:
+            to_create += await self._update_listings(to_update)
 
-            self.set_listing(listing, construct)
-            created_listings += 1
+        if to_create:
+            await self._create_listings(to_create)
 
-        if not created_listings:
-            logging.warning("No listings were created")
-        else:
-            logging.info(f"Created {created_listings} listings")
+    async def _get_our_listing_ids(self) -> set[str]:
+        listing_ids = set()
+        skip = 0
 
-        logging.info("Done with creating listings")
+        while True:
+            response = await self._run_in_thread(
+                self.backpack_tf.get_listings, skip, BATCH_SIZE
+            )
+            results = response.get("results", [])
+            listing_ids |= {listing["id"] for listing in results}
+            skip += len(results)
+
+            if not results or skip >= response.get("cursor", {}).get("total", 0):
+                break
+
+        return listing_ids
+
+    async def restore_listings(self) -> None:
+        """Keeps saved listings which are still on Backpack.TF and deletes the
+        ones we do not know about. Listings are reconciled once prices are
+        updated"""
+        stored_listings = await asyncio.to_thread(self.database.get_listings)
+        listing_ids = await self._get_our_listing_ids()
+
+        self._listings = {
+            key: listing
+            for key, listing in stored_listings.items()
+            if listing["id"] in listing_ids
+        }
+        await asyncio.to_thread(
+            self.database.delete_listings,
+            [key for key in stored_listings if key not in self._listings],
+        )
 
-    def delete_listing(self, sku: str, intent: str) -> None:
-        logging.debug(f"Removing {intent} listing for {sku}")
+        known_ids = {listing["id"] for listing in self._listings.values()}
+        unknown_ids = [i for i in listing_ids if i not in known_ids]
 
-        if not self.is_listed(sku, intent):
-            raise ListingDoesNotExist
+        for i in range(0, len(unknown_ids), BATCH_SIZE):
+            await self._run_in_thread(
+                self.backpack_tf.delete_listings, unknown_ids[i : i + BATCH_SIZE]
+            )
 
-        key = get_listing_key(intent, sku)
-        listing = self._listings[key]
-        asset_id = listing.get("asset_id", 0)
-        item_name = listing["item"].get("baseName")
-        assert item_name is not None, "Item name is None"
+        logging.info(
+            f"Restored {len(self._listings)} listings, "
+            f"deleted {len(unknown_ids)} unknown listings"
+        )
 
-        if asset_id:
-            success = self.backpack_tf.delete_listing_by_asset_id(asset_id)
-        else:
-            success = self.backpack_tf.delete_listing_by_sku(item_name)
+    async def _set_up_listings(self) -> None:
+        if self.options.persist_listings:
+            try:
+                await self.restore_listings()
+                return
+            except Exception:
+                logging.exception("Could not restore listings, deleting them instead")
 
-        if success is not True:
-            logging.error(f"Error when trying to delete {intent} listing for {sku}")
-            logging.error(success)
-            return
+            self._listings = {}
+            await asyncio.to_thread(self.database.delete_all_listings)
 
-        del self._listings[key]
-        logging.info(f"Deleted {intent} listing for {sku}")
+        await self._run_in_thread(self.backpack_tf.delete_all_listings)
+        logging.info("Deleted all listings")
 
     async def run(self) -> None:
-        if not self.set_user_agent():
-            return
+        try:
+            if not await self._run_in_thread(self.set_user_agent):
+                return
 
-        self.backpack_tf.delete_all_listings()
-        self._is_ready = True
-        logging.info("Deleted all listings")
+            await self._set_up_listings()
+        except Exception:
+            logging.exception("Could not set up listings")
+        finally:
+            # prices and trading wait for us, every listing is reconciled after
+            self._ready.set()
 
         while True:
-            if self._has_updated_listings or not self._listings:
-                await asyncio.sleep(1)
-                continue
+            await self._has_changes.wait()
+            self._has_changes.clear()
 
-            logging.info("Updating our listings...")
+            skus = self._pop_dirty_skus()
 
-            for i in self._listings:
-                listing = self._listings[i]
-                self._update_listing(listing)
+            if skus is not None and not skus:
+                continue
 
+            logging.info("Updating our listings...")
+            await self.reconcile_listings(skus)
             logging.info("All listings were updated!")
 
-            self._has_updated_listings = True
-
     def close(self):
-        self.backpack_tf.delete_all_listings()
-        logging.info("Deleted all listings")
+        # listings are reconciled on next startup instead
+        if not self.options.persist_listings:
+            self.backpack_tf.delete_all_listings()
+            logging.info("Deleted all listings")
+
         self._listings.clear()
         self.backpack_tf.stop_user_agent()
         logging.info("Stopped Backpack.TF user agent")
+        self._executor.shutdown(wait=False)
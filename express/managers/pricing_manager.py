@@ -1,22 +1,42 @@
 import asyncio
 import logging
+import time
 from typing import Any
 
+from requests import RequestException
 from tf2_utils.utils import to_scrap
 
-from ..exceptions import NoKeyPrice, WrongPriceFormat
+from ..exceptions import NoKeyPrice, SKUNotFound, WrongPriceFormat
+from ..pricers.price_queue import PriceEventQueue
 from ..pricers.pricing_providers import get_pricing_provider
+from ..pricers.pricing_rules import PricingRules
+from ..pricers.refresh_queue import PriceRefreshQueue
 from ..utils import filter_skus, has_invalid_price_format
 from .base_manager import BaseManager
 
 
 class PricingManager(BaseManager):
+    price_update_batch_size = 100
+
     def setup(self) -> None:
         self.autopriced_skus: list[str] = []
         self.autopriced_items: list[dict] = []
+        self.autopriced_tags: dict[str, list[str]] = {}
+        self.refresh_queue = PriceRefreshQueue()
+        self.pricing_rules = PricingRules(self.options.pricing_rules)
+        # key price from the provider, stored key prices can have rules applied
+        self._provider_key_prices: dict | None = None
+
+        # autopriced skus still waiting for their first price, None before start
+        self._pending_skus: set[str] | None = None
+        self._prices_ready = asyncio.Condition()
+        self.price_events = PriceEventQueue(
+            self.options.price_queue_size, self.options.price_queue_policy
+        )
 
+        # sockets only enqueue, updates are done by process_price_updates
         self.provider = get_pricing_provider(
-            self.options.pricing_provider, self.on_price_update
+            self.options.pricing_provider, self.price_events.put
         )
 
     @staticmethod
@@ -24,21 +44,81 @@ class PricingManager(BaseManager):
         # must be autopriced items
         return {item["sku"]: item for item in item_list if item.get("autoprice", False)}
 
-    def on_price_update(self, data: dict) -> None:
-        sku = data.get("sku")
-
-        if not sku:
-            raise WrongPriceFormat(f"Price update has no SKU: {data}")
+    def set_autopriced_items(self, autopriced_items: list[dict]) -> None:
+        self.autopriced_items = autopriced_items
+        self.autopriced_skus = filter_skus(autopriced_items)
+        self.autopriced_tags = {
+            item["sku"]: item["tags"] for item in autopriced_items if item.get("tags")
+        }
+        self.refresh_queue.set_items(autopriced_items)
 
-        if sku not in self.autopriced_skus:
-            return
+    async def process_price_updates(self) -> None:
+        dropped = 0
+        logged = 0
 
-        self.update_price(sku, data, notify_listing_manager=True)
+        while True:
+            events = await self.price_events.get_many(self.price_update_batch_size)
+            prices = {}
+
+            # queue is oldest first, so newer prices for a sku win
+            for data in events:
+                sku = data.get("sku")
+
+                if not sku:
+                    logging.warning(f"Price update has no SKU: {data}")
+                    continue
+
+                if sku in self.autopriced_skus:
+                    prices[sku] = data
+
+            if prices:
+                try:
+                    # database writes would starve the provider sockets
+                    written = await asyncio.to_thread(self.write_prices, prices)
+                    self.on_prices_written(written, notify_listing_manager=True)
+                except Exception:
+                    logging.exception(f"Could not process price updates {prices}")
+
+            if self.price_events.dropped > dropped:
+                dropped = self.price_events.dropped
+                logging.warning(
+                    f"Price queue is full, dropped {dropped} updates so far"
+                )
+
+            if self.price_events.processed // 100 > logged:
+                logged = self.price_events.processed // 100
+                logging.debug(f"Price queue: {self.price_events.get_metrics()}")
 
     def set_prices_updated(self) -> None:
         assert self.client.are_prices_updated is False
         self.client.are_prices_updated = True
 
+    def is_priced(self, sku: str) -> bool:
+        if self.client.are_prices_updated:
+            return True
+
+        if self._pending_skus is None:
+            return False
+
+        return sku not in self._pending_skus
+
+    async def wait_for_prices(self, skus: list[str]) -> None:
+        if all(self.is_priced(sku) for sku in skus):
+            return
+
+        async with self._prices_ready:
+            await self._prices_ready.wait_for(
+                lambda: all(self.is_priced(sku) for sku in skus)
+            )
+
+    async def wait_for_all_prices(self) -> None:
+        async with self._prices_ready:
+            await self._prices_ready.wait_for(lambda: self.client.are_prices_updated)
+
+    async def _notify_prices_ready(self) -> None:
+        async with self._prices_ready:
+            self._prices_ready.notify_all()
+
     def get_item(self, sku: str) -> dict[str, Any]:
         return self.database.get_item(sku)
 
@@ -58,31 +138,67 @@ class PricingManager(BaseManager):
         keys, metal = self.database.get_price(sku, intent)
         return keys * key_price + to_scrap(metal)
 
+    def apply_pricing_rules(self, prices: dict[str, dict]) -> dict[str, dict]:
+        if not self.pricing_rules:
+            return prices
+
+        if "5021;6" in prices:
+            self._provider_key_prices = prices["5021;6"]
+
+        key_prices = self._provider_key_prices or self.get_key_prices()
+        return self.pricing_rules.apply(prices, key_prices, self.autopriced_tags)
+
     def update_price(self, sku: str, data: dict, notify_listing_manager: bool) -> None:
         price = {"sku": sku} | data
 
         if has_invalid_price_format(price):
             raise WrongPriceFormat(f"Price update has invalid format: {price}")
 
-        buy = price["buy"]
-        sell = price["sell"]
+        prices = {sku: {"buy": price["buy"], "sell": price["sell"]}}
+        price = self.apply_pricing_rules(prices)[sku]
 
-        self.database.update_price(sku, buy, sell)
+        self.database.update_price(sku, price["buy"], price["sell"])
+        self.refresh_queue.touch(sku, time.time())
 
         if self.options.use_backpack_tf and notify_listing_manager:
             self.listing_manager.set_price_changed(sku)
 
-    def update_prices(
-        self, prices: dict[str, dict], notify_listing_manager: bool = True
+    def write_prices(self, prices: dict[str, dict]) -> dict[str, dict]:
+        """Validates, reprices and stores prices, returns the stored prices"""
+        valid_prices = {}
+
+        for sku in prices:
+            price = {"sku": sku} | prices[sku]
+
+            if has_invalid_price_format(price):
+                logging.warning(f"Price for {sku} has invalid format: {price}")
+                continue
+
+            valid_prices[sku] = {"buy": price["buy"], "sell": price["sell"]}
+
+        # reprice everything at once and write it in one go
+        valid_prices = self.apply_pricing_rules(valid_prices)
+        self.database.update_prices(valid_prices)
+        return valid_prices
+
+    def on_prices_written(
+        self, prices: dict[str, dict], notify_listing_manager: bool
     ) -> None:
+        updated = time.time()
+
         for sku in prices:
-            price = prices[sku]
-            self.update_price(sku, price, notify_listing_manager)
+            self.refresh_queue.touch(sku, updated)
 
-        logging.info(f"Updated prices for {len(prices)} items")
+            if self.options.use_backpack_tf and notify_listing_manager:
+                self.listing_manager.set_price_changed(sku)
+
+    def update_prices(
+        self, prices: dict[str, dict], notify_listing_manager: bool = True
+    ) -> None:
+        self.on_prices_written(self.write_prices(prices), notify_listing_manager)
 
     def get_and_update_price(self, sku: str) -> None:
-        price = self.provider.get_price(sku)
+        price = self.provider.request_price(sku)
         self.update_price(sku, price, notify_listing_manager=True)
 
     def get_and_update_prices(self, skus: list[str]) -> None:
@@ -90,7 +206,7 @@ class PricingManager(BaseManager):
             self.get_and_update_price(skus[0])
             return
 
-        prices = self.provider.get_multiple_prices(skus)
+        prices = self.provider.request_multiple_prices(skus)
 
         if not prices:
             logging.warning(f"No price data received for {skus} ({prices})")
@@ -98,23 +214,67 @@ class PricingManager(BaseManager):
 
         self.update_prices(prices)
 
-    def update_pricelist(self) -> None:
+    async def update_pricelist(self) -> None:
         logging.info("Updating autopriced items...")
 
         autopriced_items = self.database.get_autopriced()
         skus = filter_skus(autopriced_items)
+        self.set_autopriced_items(autopriced_items)
+        self._pending_skus = set(skus)
+        await self._notify_prices_ready()
 
         if not skus:
             logging.info("No autopriced items to update")
             return
 
-        prices = self.provider.get_multiple_prices(skus)
-        logging.debug(f"Got prices for {len(prices)} out of {len(skus)} items")
-        # dont notify listing manager, we will create listings after this
-        self.update_prices(prices, notify_listing_manager=False)
-
-        self.autopriced_items = autopriced_items
-        self.autopriced_skus = skus
+        # keys are needed to value everything else, so get them first
+        if "5021;6" in skus:
+            skus.remove("5021;6")
+            skus.insert(0, "5021;6")
+
+        chunks = self.provider.iter_multiple_prices(skus, self.options.price_chunk_size)
+        priced = 0
+
+        try:
+            while True:
+                # fetch next chunk without blocking the event loop
+                try:
+                    prices = await asyncio.to_thread(next, chunks, None)
+                except Exception:
+                    # the provider can not give us more chunks after an error
+                    logging.exception("Could not get prices from provider")
+                    break
+
+                if prices is None:
+                    break
+
+                try:
+                    written = await asyncio.to_thread(self.write_prices, prices)
+                    # dont notify listing manager, we update listings for the
+                    # chunk below
+                    self.on_prices_written(written, notify_listing_manager=False)
+                except Exception:
+                    logging.exception(f"Could not update prices for {list(prices)}")
+                    continue
+                finally:
+                    self._pending_skus -= set(prices)
+                    await self._notify_prices_ready()
+
+                priced += len(prices)
+                logging.debug(f"Got prices for {priced} out of {len(skus)} items")
+
+                if self.options.use_backpack_tf:
+                    await self.listing_manager.reconcile_listings(set(prices))
+        finally:
+            if self._pending_skus:
+                logging.warning(
+                    f"{len(self._pending_skus)} items were not priced, "
+                    "using their stored prices"
+                )
+
+            # trades waiting on these prices use what we have
+            self._pending_skus = set()
+            await self._notify_prices_ready()
 
     def get_skus_changed(self) -> list[str]:
         current_autopriced = self.database.get_autopriced()
@@ -142,11 +302,18 @@ class PricingManager(BaseManager):
         if self.options.use_backpack_tf:
             await self.listing_manager.wait_until_ready()
 
-        self.update_pricelist()
-        self.set_prices_updated()
+        try:
+            await self.update_pricelist()
+        except Exception:
+            logging.exception("Could not update pricelist")
+        finally:
+            # trading waits for this, so it is set even if updating failed
+            self.set_prices_updated()
+            await self._notify_prices_ready()
 
+        # list items without autoprice and remove listings we no longer want
         if self.options.use_backpack_tf:
-            self.listing_manager.create_listings()
+            await self.listing_manager.reconcile_listings()
 
         # fetches prices and checks for pricelist changes
         while True:
@@ -160,8 +327,46 @@ class PricingManager(BaseManager):
                 continue
 
             logging.info("Pricelist has changed, updating prices and listings...")
+            # new items need to be known before pricing rules are applied
+            self.set_autopriced_items(self.database.get_autopriced())
             self.get_and_update_prices(skus)
 
-            autopriced_items = self.database.get_autopriced()
-            self.autopriced_items = autopriced_items
-            self.autopriced_skus = filter_skus(autopriced_items)
+    async def refresh_stale_prices(self) -> None:
+        # spread requests evenly so provider traffic stays flat
+        interval = 60 / self.options.price_refresh_requests_per_minute
+        min_age = self.options.price_refresh_min_age
+
+        while True:
+            await asyncio.sleep(interval)
+
+            oldest = self.refresh_queue.get_oldest()
+
+            if oldest is None:
+                continue
+
+            sku, updated = oldest
+            age = time.time() - updated
+
+            # the stalest price is still fresh, so every price is
+            if age < min_age:
+                continue
+
+            # removed from the pricelist while it was queued
+            if not self.database.get_item(sku):
+                self.refresh_queue.remove(sku)
+                continue
+
+            logging.debug(f"Refreshing price for {sku} ({age=:.0f}s)")
+
+            try:
+                price = await asyncio.to_thread(self.provider.request_price, sku)
+                self.update_price(sku, price, notify_listing_manager=True)
+            except SKUNotFound:
+                self.refresh_queue.remove(sku)
+            except (RequestException, WrongPriceFormat) as e:
+                logging.warning(f"Could not refresh price for {sku}: {e}")
+                # try again when the rest of the pricelist has been refreshed
+                self.refresh_queue.touch(sku, time.time())
+            except Exception:
+                logging.exception(f"Could not refresh price for {sku}")
+                self.refresh_queue.touch(sku, time.time())
@@ -19,6 +19,7 @@ from tf2_utils import (
     to_scrap,
 )
 
+from ..cache import LRUCache
 from ..conversion import item_data_to_item_object, item_object_to_item_data
 from ..inventory import get_non_pure_skus
 from ..options import COUNTER_OFFER_MESSAGE, SEND_OFFER_MESSAGE
@@ -27,10 +28,34 @@ from .base_manager import BaseManager
 
 
 class TradeManager(BaseManager):
+    offer_items_cache_size = 256
+
     def setup(self) -> None:
         self.arbitrage = self.client.arbitrage_manager
         self.owners = [str(steam_id) for steam_id in self.options.owners]
         self.blacklist = [str(steam_id) for steam_id in self.options.blacklist]
+        # offer id -> (their items, our items) as item data
+        self._offer_items = LRUCache(self.offer_items_cache_size)
+
+    def get_offer_item_data(
+        self, trade: steam.TradeOffer
+    ) -> tuple[list[dict], list[dict]]:
+        """Their and our items as item data, converted once per offer. Returns
+        copies since offers mark the items they value"""
+        offer_id = str(trade.id)
+        items = self._offer_items.get(offer_id) if trade.id else None
+
+        if items is None:
+            items = (
+                [item_object_to_item_data(i) for i in trade.receiving],
+                [item_object_to_item_data(i) for i in trade.sending],
+            )
+
+            if trade.id:
+                self._offer_items.set(offer_id, items)
+
+        their_items, our_items = items
+        return [i.copy() for i in their_items], [i.copy() for i in our_items]
 
     @staticmethod
     def _is_offer_active(trade: steam.TradeOffer) -> bool:
@@ -331,6 +356,17 @@ class TradeManager(BaseManager):
             their_items = []
 
         key_scrap_price = self.pricing_manager.get_key_scrap_price(swapped_intent)
+        pure = self.inventory_manager.get_pure()
+        our_scrap = pure.get_total_scrap(key_scrap_price)
+
+        # we can not pay without at least this much pure
+        if intent == "buy" and our_scrap < total_scrap_price:
+            logging.warning("We do not have enough pure for trade")
+
+            if partner.is_friend():
+                await partner.send("Sorry, I do not have enough pure for this trade")
+            return
+
         currencies = CurrencyExchange(
             their_inventory, our_inventory, intent, total_scrap_price, key_scrap_price
         )
@@ -365,10 +401,11 @@ class TradeManager(BaseManager):
         partner_steam_id = str(partner.id64)
         offer_data = {}
 
-        # get fresh instance of inventory (stores both our and theirs)
-        inventory = self.inventory_manager.get_inventory_instance()
-        our_inventory = self.inventory_manager.our_inventory
-        their_inventory = inventory.fetch_their_inventory(partner_steam_id)
+        # pure in our other pending offers can not be used
+        our_inventory = self.inventory_manager.get_unreserved_inventory()
+        their_inventory = await self.inventory_manager.fetch_partner_inventory(
+            partner_steam_id
+        )
         data = await self._get_offer_items(
             partner,
             intent,
@@ -423,6 +460,10 @@ class TradeManager(BaseManager):
             offer_data,
         )
 
+    def _reserve_pure(self, offer: steam.TradeOffer) -> None:
+        _, our_items = self.get_offer_item_data(offer)
+        self.inventory_manager.reserve_pure(str(offer.id), our_items)
+
     async def counter_offer(
         self,
         trade: steam.TradeOffer,
@@ -464,6 +505,7 @@ class TradeManager(BaseManager):
 
         offer, offer_data = data
         await trade.counter(offer)
+        self._reserve_pure(offer)
         self.client.add_offer_data(offer.id, offer_data)
 
     async def counter_taking_offer(
@@ -493,7 +535,7 @@ class TradeManager(BaseManager):
             await self.accept(trade)
             return
 
-        if self.listing_manager.is_backpack_tf_banned(partner_id):
+        if await self.listing_manager.is_backpack_tf_banned(partner_id):
             logging.info("User is banned on Backpack.TF")
             await self.decline(trade)
             return
@@ -514,8 +556,7 @@ class TradeManager(BaseManager):
             await self.decline(trade)
             return
 
-        their_items = [item_object_to_item_data(i) for i in trade.receiving]
-        our_items = [item_object_to_item_data(i) for i in trade.sending]
+        their_items, our_items = self.get_offer_item_data(trade)
 
         if self.is_arbitrage_offer(their_items, our_items):
             logging.info("Offer is an arbitrage offer")
@@ -539,6 +580,10 @@ class TradeManager(BaseManager):
             logging.warning("Trade would surpass our max stock, ignoring offer")
             return
 
+        # prices are fetched in chunks on startup, wait for the ones we need
+        skus = [get_sku(i) for i in their_items + our_items]
+        await self.pricing_manager.wait_for_prices(skus)
+
         all_skus = self.database.get_skus()
 
         # we dont care about unpriced items on their side
@@ -634,7 +679,7 @@ class TradeManager(BaseManager):
 
             return 0
 
-        if self.listing_manager.is_backpack_tf_banned(steam_id):
+        if await self.listing_manager.is_backpack_tf_banned(steam_id):
             logging.info("User is banned on Backpack.TF, not sending offer")
 
             if is_friend:
@@ -642,7 +687,13 @@ class TradeManager(BaseManager):
 
             return 0
 
-        await self.client.bot_is_ready_and_prices_updated()
+        if item_type == "sku":
+            await self.client.bot_is_ready_and_prices_updated(items)
+        else:
+            # we dont know which skus the asset ids are yet
+            await self.client.bot_is_ready_and_prices_updated()
+            await self.pricing_manager.wait_for_all_prices()
+
         data = await self._create_offer(
             partner, items, item_type, intent, token=token, scrap_value=scrap_value
         )
@@ -658,6 +709,7 @@ class TradeManager(BaseManager):
 
         await partner.send(trade=offer)
 
+        self._reserve_pure(offer)
         self.client.add_offer_data(offer.id, offer_data)
         logging.info(f"Sent offer for {items} to {partner.name}")
 
@@ -693,8 +745,10 @@ class TradeManager(BaseManager):
         is_friend = trade.user.is_friend()
         state_name = trade.state.name.lower()
         was_accepted = trade.state == steam.TradeOfferState.Accepted
-        their_items = [item_object_to_item_data(i) for i in trade.receiving]
-        our_items = [item_object_to_item_data(i) for i in trade.sending]
+        their_items, our_items = self.get_offer_item_data(trade)
+
+        if not self._is_offer_active(trade):
+            self._offer_items.pop(offer_id)
 
         logging.info(f"Offer #{offer_id} with {trade.user.name} was {state_name}")
 
@@ -722,8 +776,14 @@ class TradeManager(BaseManager):
             await self.arbitrage.process_offer_state(trade, their_items, our_items)
 
         if not was_accepted:
+            if not self._is_offer_active(trade):
+                self.inventory_manager.release_pure(offer_id)
+
             return
 
+        # their items moved, so the cached inventory is outdated
+        self.inventory_manager.invalidate_partner_inventory(steam_id)
+
         if is_friend:
             await trade.user.send("Thank you for the trade!")
 
@@ -743,10 +803,14 @@ class TradeManager(BaseManager):
         # await self._group.invite(trade.user)
         logging.debug("Getting receipt...")
 
-        receipt = await trade.receipt()
-        await self.client.inventory_manager.update_inventory_with_receipt(
-            their_items, our_items, receipt
-        )
+        try:
+            receipt = await trade.receipt()
+            await self.client.inventory_manager.update_inventory_with_receipt(
+                their_items, our_items, receipt
+            )
+        finally:
+            # the offer is done, even if we could not apply its receipt
+            self.inventory_manager.release_pure(offer_id)
 
         logging.debug("Inventory was updated after receipt")
 
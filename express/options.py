@@ -42,10 +42,24 @@ class Options:
     use_backpack_tf: bool
     backpack_tf_token: str = ""
     pricing_provider: str = "pricedb"  # pricedb
+    price_refresh_requests_per_minute: int = 0  # 0 disables refreshing stale prices
+    price_refresh_min_age: int = 3600  # seconds before a price is considered stale
+    price_queue_size: int = 1000  # max pending price updates from the socket
+    price_queue_policy: str = "merge"  # merge, drop_oldest, drop_newest
+    pricing_rules: list[dict] = field(default_factory=list)  # applied to autoprices
+    price_chunk_size: int = 50  # prices fetched and listed at a time on startup
     inventory_provider: str = "steamcommunity"  # steamsupply, expressload, etc.
     inventory_api_key: str = ""  # api key for the inventory provider
+    # {"provider": ..., "api_key": ...}, raced instead of inventory_provider
+    inventory_providers: list[dict] = field(default_factory=list)
+    inventory_hedge_delay: float = 2.0  # seconds before the next provider is asked
+    partner_inventory_ttl: int = 30  # seconds a partner inventory is reused
+    inventory_refresh_interval: int = 0  # seconds between refetches, 0 disables
+    inventory_snapshot: bool = True  # start from our last saved inventory
     backpack_tf_user_agent: str = "Listing goin' up!"
     check_backpack_tf_bans: bool = False
+    persist_listings: bool = True  # keep listings between restarts
+    backpack_tf_timeout: int = 60  # seconds a backpack.tf request waits to be sent
     backpack_tf_api_key: str = ""  # api key for backpack.tf
     accept_donations: bool = True
     counter_bad_offers: bool = False  # counter offers with wrong values
@@ -0,0 +1,103 @@
+import asyncio
+import time
+from collections import OrderedDict
+from itertools import count
+
+POLICIES = ["merge", "drop_oldest", "drop_newest"]
+
+
+class PriceEventQueue:
+    """Bounded queue between pricing provider sockets and the price worker.
+
+    merge: newer events replace pending events for the same SKU, oldest
+    event is dropped when full. drop_oldest/drop_newest: every event is
+    kept until full, then the oldest or the incoming event is dropped"""
+
+    def __init__(self, maxsize: int = 1000, policy: str = "merge") -> None:
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown price queue policy: {policy}")
+
+        self.maxsize = maxsize
+        self.policy = policy
+
+        # key -> (data, time enqueued)
+        self._events: OrderedDict[str | int, tuple[dict, float]] = OrderedDict()
+        self._counter = count()
+        self._has_events = asyncio.Event()
+
+        self.received = 0
+        self.processed = 0
+        self.merged = 0
+        self.dropped = 0
+        self.last_event_age = 0.0
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def _get_key(self, data: dict) -> str | int:
+        sku = data.get("sku")
+
+        if self.policy == "merge" and sku:
+            return sku
+
+        return next(self._counter)
+
+    def put(self, data: dict) -> None:
+        self.received += 1
+        key = self._get_key(data)
+
+        if key in self._events:
+            # keep position and age of the pending event, only newest data matters
+            _, enqueued_at = self._events[key]
+            self._events[key] = (data, enqueued_at)
+            self.merged += 1
+            return
+
+        if len(self._events) >= self.maxsize:
+            self.dropped += 1
+
+            if self.policy == "drop_newest":
+                return
+
+            self._events.popitem(last=False)
+
+        self._events[key] = (data, time.monotonic())
+        self._has_events.set()
+
+    async def get(self) -> dict:
+        while not self._events:
+            self._has_events.clear()
+            await self._has_events.wait()
+
+        _, (data, enqueued_at) = self._events.popitem(last=False)
+        self.last_event_age = time.monotonic() - enqueued_at
+        self.processed += 1
+
+        return data
+
+    async def get_many(self, limit: int) -> list[dict]:
+        """Wait for an event, then take up to limit pending events"""
+        events = [await self.get()]
+
+        while self._events and len(events) < limit:
+            events.append(await self.get())
+
+        return events
+
+    def get_oldest_age(self) -> float:
+        if not self._events:
+            return 0.0
+
+        _, enqueued_at = next(iter(self._events.values()))
+        return time.monotonic() - enqueued_at
+
+    def get_metrics(self) -> dict[str, int | float]:
+        return {
+            "depth": len(self._events),
+            "oldest_age": round(self.get_oldest_age(), 3),
+            "last_event_age": round(self.last_event_age, 3),
+            "received": self.received,
+            "processed": self.processed,
+            "merged": self.merged,
+            "dropped": self.dropped,
+        }
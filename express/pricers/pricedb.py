@@ -7,6 +7,8 @@ from socketio.exceptions import ConnectionError
 
 from .pricing_provider import PricingProvider
 
+BULK_LIMIT = 50  # more skus than this and we have to download the schema
+
 # NOTE: prices are on the format we expect, so no need to format it
 # {
 #     "sku": "5021;6",
@@ -48,7 +50,7 @@ class BasePriceDB:
         prices = {}
         data = []
 
-        if len(skus) <= 50:
+        if len(skus) <= BULK_LIMIT:
             data = self.get_items_bulk(skus)
         else:
             data = self.get_prices_by_schema(skus)
@@ -61,6 +63,8 @@ class BasePriceDB:
 
 
 class PriceDB(BasePriceDB, PricingProvider):
+    max_chunk_size = BULK_LIMIT
+
     def __init__(self, callback: Callable[[dict], None]):
         super().__init__()
         PricingProvider.__init__(self, callback)
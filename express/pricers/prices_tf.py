@@ -1,7 +1,7 @@
 import asyncio
 import json
 import logging
-from typing import Callable
+from typing import Callable, Iterator
 
 from tf2_utils import PricesTF as PricesTFUtils
 from websockets import connect
@@ -48,21 +48,41 @@ class PricesTF(PricesTFUtils, PricingProvider):
 
         return self.format_data(data)
 
-    def get_multiple_prices(self, skus: list[str]) -> dict:
-        # fetch 10 pages (500 prices), hopefully every sku is there
-        prices = self.get_prices_till_page(10)
+    def _get_first_prices(self) -> dict:
+        # first 10 pages (500 prices) covers most skus in one go
+        prices = self._single_flight(("pages", 10), self.get_prices_till_page, 10)
+
+        for sku in prices:
+            self._prices.set(sku, prices[sku])
 
-        for sku in prices.copy():
-            if sku not in skus:
-                del prices[sku]
+        return prices
+
+    def get_multiple_prices(self, skus: list[str]) -> dict:
+        prices = self._get_first_prices()
+        prices = {sku: prices[sku] for sku in skus if sku in prices}
 
         # fetch missing prices one by one
         for sku in skus:
             if sku not in prices:
-                prices[sku] = self.get_price(sku)
+                prices[sku] = self.request_price(sku)
 
         return prices
 
+    def iter_multiple_prices(
+        self, skus: list[str], chunk_size: int = 50
+    ) -> Iterator[dict]:
+        prices = self._get_first_prices()
+        found = {sku: prices[sku] for sku in skus if sku in prices}
+
+        if found:
+            yield found
+
+        missing = [sku for sku in skus if sku not in found]
+
+        # fetch missing prices one by one, shared with other requests for them
+        for i in range(0, len(missing), chunk_size):
+            yield {sku: self.request_price(sku) for sku in missing[i : i + chunk_size]}
+
     async def process_message(self, ws: Connection, message: dict) -> None:
         if message.get("type") != "AUTH_REQUIRED":
             data = self.format_websocket_data(message)
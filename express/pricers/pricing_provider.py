@@ -1,7 +1,17 @@
-from typing import Callable
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable, Iterator
+
+from ..cache import LRUCache
 
 
 class PricingProvider:
+    # absorbs bursts of requests for the same prices
+    price_cache_size = 4096
+    price_cache_ttl = 10.0
+    # most prices the provider can get in one request, None if unlimited
+    max_chunk_size: int | None = None
+
     def __init__(self, callback: Callable[[dict], None]) -> None:
         """Callback has to get a dict with the following format:
 
@@ -20,6 +30,70 @@ class PricingProvider:
         """
         self.callback = callback
 
+        self._prices = LRUCache(self.price_cache_size, self.price_cache_ttl)
+        self._in_flight: dict[Hashable, Future] = {}
+        self._in_flight_lock = threading.Lock()
+
+    def _single_flight(self, key: Hashable, func: Callable, *args) -> Any:
+        """Concurrent calls with the same key share one request and result"""
+        with self._in_flight_lock:
+            future = self._in_flight.get(key)
+            is_leader = future is None
+
+            if is_leader:
+                future = Future()
+                self._in_flight[key] = future
+
+        if not is_leader:
+            return future.result()
+
+        try:
+            result = func(*args)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._in_flight_lock:
+                del self._in_flight[key]
+
+    def request_price(self, sku: str) -> dict:
+        """Same as `get_price`, but deduplicated and cached"""
+        price = self._prices.get(sku)
+
+        if price is not None:
+            return price
+
+        price = self._single_flight(sku, self.get_price, sku)
+        self._prices.set(sku, price)
+
+        return price
+
+    def request_multiple_prices(self, skus: list[str]) -> dict:
+        """Same as `get_multiple_prices`, but deduplicated and cached"""
+        prices = {}
+        missing = []
+
+        for sku in skus:
+            price = self._prices.get(sku)
+
+            if price is None:
+                missing.append(sku)
+            else:
+                prices[sku] = price
+
+        if not missing:
+            return prices
+
+        key = tuple(sorted(set(missing)))
+        fetched = self._single_flight(key, self.get_multiple_prices, list(key))
+
+        for sku in fetched:
+            self._prices.set(sku, fetched[sku])
+
+        return prices | fetched
+
     def get_price(self, sku: str) -> dict:
         """Has to return a dict with the following format:
 
@@ -69,6 +143,17 @@ class PricingProvider:
         """
         raise NotImplementedError
 
+    def iter_multiple_prices(
+        self, skus: list[str], chunk_size: int = 50
+    ) -> Iterator[dict]:
+        """Yields prices on the same format as `get_multiple_prices`, one
+        chunk at a time so callers can use prices as soon as they arrive"""
+        if self.max_chunk_size is not None:
+            chunk_size = min(chunk_size, self.max_chunk_size)
+
+        for i in range(0, len(skus), chunk_size):
+            yield self.request_multiple_prices(skus[i : i + chunk_size])
+
     async def listen(self) -> None:
         raise NotImplementedError
 
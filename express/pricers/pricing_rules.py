@@ -0,0 +1,164 @@
+import logging
+import math
+import re
+from dataclasses import dataclass
+from fnmatch import translate
+
+import numpy as np
+from tf2_utils import is_key, to_scrap
+
+
+@dataclass
+class PricingRule:
+    # what to match, every given condition has to match
+    sku: str = "*"  # glob pattern, e.g. "*;11*" or "5021;6"
+    quality: int | None = None
+    tag: str | None = None  # has to be in the "tags" list of the item
+    # what to apply, in this order
+    buy_percent: float = 0.0  # e.g. -5 to buy for 5% less
+    sell_percent: float = 0.0  # e.g. 5 to sell for 5% more
+    buy_scrap: int = 0
+    sell_scrap: int = 0
+    min_key_ratio: float | None = None  # e.g. 0.5 to never go below half a key
+    max_key_ratio: float | None = None
+    min_spread_scrap: int | None = None  # buy is lowered to keep this spread
+
+    def __post_init__(self) -> None:
+        self._pattern = re.compile(translate(self.sku))
+
+    def get_mask(
+        self, skus: list[str], qualities: np.ndarray, tags: dict[str, list[str]]
+    ) -> np.ndarray:
+        mask = np.ones(len(skus), dtype=bool)
+
+        if self.sku != "*":
+            mask &= np.fromiter(
+                (self._pattern.match(sku) is not None for sku in skus),
+                dtype=bool,
+                count=len(skus),
+            )
+
+        if self.quality is not None:
+            mask &= qualities == self.quality
+
+        if self.tag is not None:
+            mask &= np.fromiter(
+                (self.tag in tags.get(sku, []) for sku in skus),
+                dtype=bool,
+                count=len(skus),
+            )
+
+        return mask
+
+
+def to_scrap_array(prices: list[dict], key_scrap: int) -> np.ndarray:
+    keys = np.fromiter((i.get("keys", 0) for i in prices), np.int64, len(prices))
+    metal = np.fromiter((i.get("metal", 0.0) for i in prices), float, len(prices))
+    # same as tf2_utils.to_scrap
+    return keys * key_scrap + np.ceil(metal * 9).astype(np.int64)
+
+
+def to_currencies(scrap: np.ndarray, key_scrap: int, is_key_mask: np.ndarray) -> list:
+    keys = np.where(is_key_mask, 0, scrap // key_scrap)
+    # same as tf2_utils.to_refined
+    metal = np.floor((scrap - keys * key_scrap) / 9 * 100) / 100
+
+    return [
+        {"keys": int(k), "metal": float(m)}
+        for k, m in zip(keys.tolist(), metal.tolist())
+    ]
+
+
+class PricingRules:
+    """Applies markups, spreads and clamps to provider prices. Prices are
+    converted to integer scrap arrays so all SKUs are repriced at once"""
+
+    def __init__(self, rules: list[dict]) -> None:
+        self.rules = [PricingRule(**rule) for rule in rules]
+
+    def __bool__(self) -> bool:
+        return len(self.rules) > 0
+
+    def apply(
+        self,
+        prices: dict[str, dict],
+        key_prices: dict,
+        tags: dict[str, list[str]] = {},
+    ) -> dict[str, dict]:
+        """Takes and returns prices on the format {sku: {"buy": ..., "sell": ...}}
+        `key_prices` is the buy and sell price of a key from the provider. Only
+        prices matched by a rule are changed, and keys only by rules for
+        "5021;6" since every other price depends on them"""
+        if not self.rules or not prices:
+            return prices
+
+        key_buy = to_scrap(key_prices.get("buy", {}).get("metal", 0.0))
+        key_sell = to_scrap(key_prices.get("sell", {}).get("metal", 0.0))
+
+        if not key_buy or not key_sell:
+            logging.warning("Keys need to have a price to apply pricing rules")
+            return prices
+
+        skus = list(prices)
+        qualities = np.fromiter(
+            (int(sku.split(";")[1]) for sku in skus), np.int64, len(skus)
+        )
+        is_key_mask = np.fromiter((is_key(sku) for sku in skus), bool, len(skus))
+        buy = to_scrap_array([prices[sku]["buy"] for sku in skus], key_buy)
+        sell = to_scrap_array([prices[sku]["sell"] for sku in skus], key_sell)
+        matched = np.zeros(len(skus), dtype=bool)
+
+        for rule in self.rules:
+            mask = rule.get_mask(skus, qualities, tags)
+
+            if not is_key(rule.sku):
+                mask &= ~is_key_mask
+
+            if not mask.any():
+                continue
+
+            matched |= mask
+
+            # round in our favor
+            if rule.buy_percent:
+                buy[mask] = np.floor(buy[mask] * (1 + rule.buy_percent / 100))
+
+            if rule.sell_percent:
+                sell[mask] = np.ceil(sell[mask] * (1 + rule.sell_percent / 100))
+
+            buy[mask] += rule.buy_scrap
+            sell[mask] += rule.sell_scrap
+
+            if rule.min_key_ratio is not None:
+                buy[mask] = np.maximum(
+                    buy[mask], math.ceil(rule.min_key_ratio * key_buy)
+                )
+                sell[mask] = np.maximum(
+                    sell[mask], math.ceil(rule.min_key_ratio * key_sell)
+                )
+
+            if rule.max_key_ratio is not None:
+                buy[mask] = np.minimum(
+                    buy[mask], math.floor(rule.max_key_ratio * key_buy)
+                )
+                sell[mask] = np.minimum(
+                    sell[mask], math.floor(rule.max_key_ratio * key_sell)
+                )
+
+            if rule.min_spread_scrap is not None:
+                buy[mask] = np.minimum(buy[mask], sell[mask] - rule.min_spread_scrap)
+
+        buy = np.maximum(buy, 0)
+        sell = np.maximum(sell, 0)
+
+        buy_currencies = to_currencies(buy, key_buy, is_key_mask)
+        sell_currencies = to_currencies(sell, key_sell, is_key_mask)
+
+        return {
+            sku: (
+                {"buy": buy_currencies[i], "sell": sell_currencies[i]}
+                if matched[i]
+                else prices[sku]
+            )
+            for i, sku in enumerate(skus)
+        }
@@ -0,0 +1,51 @@
+import heapq
+
+
+class PriceRefreshQueue:
+    """Keeps autopriced SKUs in a min-heap ordered by when their price was
+    last updated, so the stalest price can always be refreshed first"""
+
+    def __init__(self) -> None:
+        self._heap: list[tuple[float, str]] = []
+        self._updated: dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._updated)
+
+    def __contains__(self, sku: str) -> bool:
+        return sku in self._updated
+
+    def set_items(self, items: list[dict]) -> None:
+        self._updated = {item["sku"]: item.get("updated", 0.0) for item in items}
+        self._heap = [(updated, sku) for sku, updated in self._updated.items()]
+        heapq.heapify(self._heap)
+
+    def touch(self, sku: str, updated: float) -> None:
+        if sku not in self._updated:
+            return
+
+        self._updated[sku] = updated
+        heapq.heappush(self._heap, (updated, sku))
+
+        # old entries are skipped lazily, rebuild if they start piling up
+        if len(self._heap) > 2 * len(self._updated) + 64:
+            self._heap = [(updated, sku) for sku, updated in self._updated.items()]
+            heapq.heapify(self._heap)
+
+    def remove(self, sku: str) -> None:
+        # its heap entries are skipped lazily
+        self._updated.pop(sku, None)
+
+    def get_oldest(self) -> tuple[str, float] | None:
+        """returns sku, updated for the stalest price"""
+        while self._heap:
+            updated, sku = self._heap[0]
+
+            # sku was touched or removed after this entry was pushed
+            if self._updated.get(sku) != updated:
+                heapq.heappop(self._heap)
+                continue
+
+            return sku, updated
+
+        return None
@@ -0,0 +1,204 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from itertools import count
+from typing import Callable
+
+import requests
+
+# lower runs first
+PRIORITIES = {"ban_check": 0, "sell": 1, "buy": 2, "other": 3}
+DEFAULT_RETRY_AFTER = 60.0
+MAX_RETRIES = 3
+
+
+class TokenBucket:
+    """Allows `rate` requests per second with bursts up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        self.rate = rate
+        self.capacity = capacity
+
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated_at
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated_at = now
+
+    def get_delay(self) -> float:
+        """Seconds until a request can be made"""
+        now = time.monotonic()
+        self._refill(now)
+
+        if now < self._paused_until:
+            return self._paused_until - now
+
+        if self._tokens >= 1:
+            return 0.0
+
+        return (1 - self._tokens) / self.rate
+
+    def consume(self) -> None:
+        self._tokens -= 1
+
+    def pause(self, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+@dataclass(order=True)
+class ScheduledRequest:
+    priority: int
+    order: int
+    bucket: str = field(compare=False)
+    args: tuple = field(compare=False)
+    kwargs: dict = field(compare=False)
+    future: Future = field(compare=False, default_factory=Future)
+    retries: int = field(compare=False, default=0)
+
+
+def get_retry_after(response: requests.Response) -> float:
+    retry_after = response.headers.get("Retry-After")
+
+    if retry_after is None:
+        return DEFAULT_RETRY_AFTER
+
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER
+
+
+class RequestScheduler:
+    """Sends requests from one worker thread. The highest priority request
+    whose token bucket allows it goes first, so a throttled endpoint does not
+    hold up the others. Rate limited requests are retried after Retry-After"""
+
+    def __init__(
+        self,
+        buckets: dict[str, TokenBucket],
+        request: Callable[..., requests.Response] = requests.request,
+    ) -> None:
+        self.buckets = buckets
+        self._request = request
+
+        self._requests: list[ScheduledRequest] = []
+        self._counter = count()
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def __len__(self) -> int:
+        return len(self._requests)
+
+    def _start(self) -> None:
+        if self._thread is not None:
+            return
+
+        self._thread = threading.Thread(target=self._work, daemon=True)
+        self._thread.start()
+
+    def _get_next_request(self) -> tuple[ScheduledRequest | None, float | None]:
+        delay = None
+
+        for request in sorted(self._requests):
+            request_delay = self.buckets[request.bucket].get_delay()
+
+            if request_delay == 0:
+                return request, None
+
+            if delay is None or request_delay < delay:
+                delay = request_delay
+
+        return None, delay
+
+    def _send(self, request: ScheduledRequest) -> None:
+        try:
+            response = self._request(*request.args, **request.kwargs)
+        except Exception as e:
+            request.future.set_exception(e)
+            return
+
+        if response.status_code != 429 or request.retries >= MAX_RETRIES:
+            request.future.set_result(response)
+            return
+
+        retry_after = get_retry_after(response)
+        logging.warning(f"Backpack.TF rate limited us, retrying in {retry_after}s")
+
+        with self._condition:
+            self.buckets[request.bucket].pause(retry_after)
+            request.retries += 1
+            self._requests.append(request)
+
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                while True:
+                    request, delay = self._get_next_request()
+
+                    if request is not None:
+                        break
+
+                    self._condition.wait(delay)
+
+                self._requests.remove(request)
+                self.buckets[request.bucket].consume()
+
+            self._send(request)
+
+    def submit(self, lane: str, bucket: str, *args, **kwargs) -> Future:
+        request = ScheduledRequest(
+            PRIORITIES[lane], next(self._counter), bucket, args, kwargs
+        )
+
+        with self._condition:
+            self._requests.append(request)
+            self._start()
+            self._condition.notify()
+
+        return request.future
+
+    def cancel(self, future: Future) -> bool:
+        """Removes a request which is waiting to be sent. Returns False if it is
+        being sent or is done"""
+        with self._condition:
+            for request in self._requests:
+                if request.future is future:
+                    self._requests.remove(request)
+                    future.cancel()
+                    return True
+
+        return False
+
+    def request(
+        self,
+        lane: str,
+        bucket: str,
+        *args,
+        wait_timeout: float | None = None,
+        **kwargs,
+    ) -> requests.Response:
+        """Raises TimeoutError if the request is still waiting to be sent after
+        `wait_timeout` seconds, it is then never sent"""
+        future = self.submit(lane, bucket, *args, **kwargs)
+
+        while True:
+            try:
+                return future.result(wait_timeout)
+            except TimeoutError:
+                if self.cancel(future):
+                    raise TimeoutError(
+                        f"Request was not sent within {wait_timeout} seconds"
+                    )
+
+                # it is being sent, so wait for its response
@@ -184,6 +184,10 @@ def create_and_get_log_file() -> Path:
     return file_path
 
 
+def get_inventory_snapshot_file(steam_id: str) -> Path:
+    return Path(__file__).parent.parent / f"snapshots/inventory-{steam_id}.json"
+
+
 class ExpressFormatter(logging.Formatter):
     _format = "tf2-express | %(asctime)s - [%(levelname)s]: %(message)s"
 
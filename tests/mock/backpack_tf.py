@@ -0,0 +1,285 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from backpack_tf.utils import get_item_hash
+from tf2_utils import SchemaItemsUtils
+
+from express.backpack_tf import get_endpoint_class
+
+API_PATH = "/api"
+
+
+def get_stats_name(method: str, path: str) -> str:
+    endpoint = path.removeprefix(API_PATH)
+
+    # single listings are counted together
+    if endpoint.startswith("/v2/classifieds/listings/") and endpoint != (
+        "/v2/classifieds/listings/batch"
+    ):
+        endpoint = "/v2/classifieds/listings/{id}"
+
+    return f"{method} {endpoint}"
+
+
+class FakeBackpackTF:
+    """Local stand-in for the parts of the Backpack.TF API the client uses.
+    Every request can be delayed, rate limited or failed, and calls and bytes
+    are counted per endpoint"""
+
+    def __init__(
+        self,
+        steam_id: str = "76561198828172881",
+        latency: float = 0.0,
+        rate_limits: dict[str, tuple[int, float]] = {},
+        retry_after: float = 1.0,
+        error_rate: float = 0.0,
+        banned: set[str] = set(),
+        seed: int = 0,
+    ) -> None:
+        self.steam_id = steam_id
+        self.latency = latency  # seconds added to every request
+        # endpoint class -> (requests, per seconds)
+        self.rate_limits = rate_limits
+        self.retry_after = retry_after
+        self.error_rate = error_rate  # share of requests which fail with 500
+        self.banned = set(banned)
+
+        self.listings: dict[str, dict] = {}
+        self.agent_status = "inactive"
+        self.stats: dict[str, dict[str, int]] = {}
+
+        self._random = random.Random(seed)
+        self._schema = SchemaItemsUtils()
+        self._failures: list[int] = []
+        self._windows: dict[str, tuple[float, int]] = {}
+        self._lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), FakeBackpackTFHandler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        self._thread = None
+
+    def __enter__(self) -> "FakeBackpackTF":
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}{API_PATH}"
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, args=(0.05,), daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def fail_next(self, status: int, times: int = 1) -> None:
+        """Makes the next `times` requests fail with `status`"""
+        with self._lock:
+            self._failures += [status] * times
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.stats = {}
+
+    def get_total(self, stat: str) -> int:
+        return sum(i[stat] for i in self.stats.values())
+
+    def _add_stats(self, name: str, received: int, sent: int, status: int) -> None:
+        with self._lock:
+            stats = self.stats.setdefault(
+                name, {"calls": 0, "received": 0, "sent": 0, "errors": 0}
+            )
+            stats["calls"] += 1
+            stats["received"] += received
+            stats["sent"] += sent
+            stats["errors"] += status >= 400
+
+    def _is_rate_limited(self, endpoint_class: str) -> bool:
+        if endpoint_class not in self.rate_limits:
+            return False
+
+        limit, window = self.rate_limits[endpoint_class]
+        now = time.monotonic()
+
+        with self._lock:
+            started_at, calls = self._windows.get(endpoint_class, (now, 0))
+
+            if now - started_at >= window:
+                started_at, calls = now, 0
+
+            self._windows[endpoint_class] = (started_at, calls + 1)
+
+        return calls >= limit
+
+    def _get_failure(self) -> int | None:
+        with self._lock:
+            if self._failures:
+                return self._failures.pop(0)
+
+        if self.error_rate and self._random.random() < self.error_rate:
+            return 500
+
+    def _get_listing_id(self, listing: dict) -> str:
+        if "id" in listing:
+            return f"440_{listing['id']}"
+
+        item = listing["item"]
+        name = f"{item['quality']['id']};{item['baseName']};{item['craftable']}"
+        return f"440_{self.steam_id}_{get_item_hash(name)}"
+
+    def _create_listing(self, listing: dict) -> dict:
+        item = listing["item"]
+        now = int(time.time())
+        listing_id = self._get_listing_id(listing)
+        created = {
+            "id": listing_id,
+            "steamid": self.steam_id,
+            "appid": 440,
+            "currencies": listing["currencies"],
+            "value": {},
+            "details": listing["details"],
+            "listedAt": self.listings.get(listing_id, {}).get("listedAt", now),
+            "bumpedAt": now,
+            "intent": "sell" if "id" in listing else "buy",
+            "count": 1,
+            "status": "active",
+            "source": "userAgent",
+            "item": item
+            | {"defindex": self._schema.name_to_defindex(item["baseName"])},
+        }
+        self.listings[listing_id] = created
+        return created
+
+    def handle(self, method: str, path: str, query: dict, body) -> tuple[int, object]:
+        endpoint = path.removeprefix(API_PATH)
+
+        if "token" not in query:
+            return 401, {"message": "Missing token"}
+
+        if endpoint == "/agent/pulse" and method == "POST":
+            self.agent_status = "active"
+            return 200, {"status": self.agent_status, "client": "tf2-express"}
+
+        if endpoint == "/agent/status" and method == "POST":
+            return 200, {"status": self.agent_status}
+
+        if endpoint == "/agent/stop" and method == "POST":
+            self.agent_status = "inactive"
+            return 200, {"status": self.agent_status}
+
+        if endpoint == "/users/info/v1" and method == "GET":
+            steam_ids = query.get("steamids", "").split(",")
+            users = {
+                i: {"name": i} | ({"bans": {"all": 1}} if i in self.banned else {})
+                for i in steam_ids
+            }
+            return 200, {"users": users}
+
+        if endpoint == "/v2/classifieds/listings" and method == "GET":
+            skip = int(query.get("skip", 0))
+            limit = int(query.get("limit", 100))
+            listings = list(self.listings.values())
+            return 200, {
+                "results": listings[skip : skip + limit],
+                "cursor": {"skip": skip, "limit": limit, "total": len(listings)},
+            }
+
+        if endpoint == "/v2/classifieds/listings" and method == "POST":
+            return 200, self._create_listing(body)
+
+        if endpoint == "/v2/classifieds/listings" and method == "DELETE":
+            deleted = len(self.listings)
+            self.listings.clear()
+            return 200, {"deleted": deleted}
+
+        if endpoint == "/v2/classifieds/listings/batch" and method == "POST":
+            return 200, [{"result": self._create_listing(i)} for i in body]
+
+        if endpoint.startswith("/v2/classifieds/listings/") and method == "PATCH":
+            listing = self.listings.get(endpoint.rsplit("/", 1)[1])
+
+            if listing is None:
+                return 404, {"message": "Listing not found"}
+
+            listing |= {
+                key: body[key] for key in ["details", "currencies"] if key in body
+            }
+            return 200, listing
+
+        if endpoint.startswith("/v2/classifieds/listings/") and method == "DELETE":
+            listing_id = endpoint.rsplit("/", 1)[1]
+
+            if self.listings.pop(listing_id, None) is None:
+                return 404, {"message": "Listing not found"}
+
+            return 200, True
+
+        if endpoint == "/classifieds/delete/v1" and method == "DELETE":
+            listing_ids = body["listing_ids"]
+            deleted = [i for i in listing_ids if self.listings.pop(i, None)]
+            return 200, {"deleted": len(deleted), "errors": []}
+
+        return 404, {"message": f"Unknown endpoint {method} {endpoint}"}
+
+
+class FakeBackpackTFHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def _handle(self) -> None:
+        fake: FakeBackpackTF = self.server.fake
+        url = urlparse(self.path)
+        query = {key: value[0] for key, value in parse_qs(url.query).items()}
+        length = int(self.headers.get("Content-Length", 0))
+        raw_body = self.rfile.read(length) if length else b""
+        endpoint_class = get_endpoint_class(url.path.removeprefix(API_PATH))
+        headers = {}
+
+        if fake.latency:
+            time.sleep(fake.latency)
+
+        if fake._is_rate_limited(endpoint_class):
+            status, response = 429, {"message": "Too Many Requests"}
+            headers["Retry-After"] = str(fake.retry_after)
+        elif (failure := fake._get_failure()) is not None:
+            status, response = failure, {"message": "Injected error"}
+        else:
+            body = json.loads(raw_body) if raw_body else None
+
+            with fake._state_lock:
+                status, response = fake.handle(self.command, url.path, query, body)
+
+        data = json.dumps(response).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+
+        for key, value in headers.items():
+            self.send_header(key, value)
+
+        self.end_headers()
+        self.wfile.write(data)
+
+        fake._add_stats(
+            get_stats_name(self.command, url.path), len(raw_body), len(data), status
+        )
+
+    do_GET = _handle
+    do_POST = _handle
+    do_DELETE = _handle
+    do_PATCH = _handle
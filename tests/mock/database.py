@@ -0,0 +1,72 @@
+from copy import deepcopy
+
+from express.exceptions import SKUNotFound
+from express.utils import has_buy_and_sell_price, normalize_item_name
+
+
+class Database:
+    """In-memory stand-in for the item and listing parts of the database"""
+
+    def __init__(self, items: list[dict] = []) -> None:
+        self.name = "mock"
+        self.items = {item["sku"]: deepcopy(item) for item in items}
+        self.listings = {}
+        self.trades = []
+
+    def has_price(self, sku: str) -> bool:
+        return has_buy_and_sell_price(self.get_item(sku))
+
+    def get_normalized_item_name(self, sku: str) -> str | None:
+        item = self.get_item(sku)
+
+        if item:
+            return normalize_item_name(item["name"])
+
+    def get_skus(self) -> list[str]:
+        return list(self.items)
+
+    def get_item(self, sku: str) -> dict:
+        return deepcopy(self.items.get(sku, {}))
+
+    def get_autopriced(self) -> list[dict]:
+        return [i for i in self.get_pricelist() if i.get("autoprice")]
+
+    def get_pricelist(self) -> list[dict]:
+        return deepcopy(list(self.items.values()))
+
+    def get_items(self, skus: list[str]) -> list[dict]:
+        return [self.get_item(sku) for sku in skus if sku in self.items]
+
+    def get_max_stock(self, sku: str) -> int:
+        return self.get_item(sku).get("max_stock", -1)
+
+    def update_item_stock(self, stock: dict[str, int]) -> None:
+        for sku, in_stock in stock.items():
+            if sku in self.items:
+                self.items[sku]["in_stock"] = in_stock
+
+    def update_price(self, sku: str, buy: dict, sell: dict) -> None:
+        if sku not in self.items:
+            raise SKUNotFound(f"{sku} does not exist in database!")
+
+        self.items[sku] |= {"buy": buy, "sell": sell}
+
+    def update_prices(self, prices: dict[str, dict]) -> None:
+        for sku, price in prices.items():
+            self.items[sku] |= price
+
+    def insert_trade(self, data: dict) -> None:
+        self.trades.append(deepcopy(data))
+
+    def get_listings(self) -> dict[str, dict]:
+        return deepcopy(self.listings)
+
+    def set_listings(self, listings: dict[str, dict]) -> None:
+        self.listings |= deepcopy(listings)
+
+    def delete_listings(self, keys: list[str]) -> None:
+        for key in keys:
+            self.listings.pop(key, None)
+
+    def delete_all_listings(self) -> None:
+        self.listings = {}
@@ -0,0 +1,106 @@
+import pytest
+import requests
+from backpack_tf import NoTokenProvided
+
+from express.backpack_tf import ExpressBackpackTF
+
+from .mock.backpack_tf import FakeBackpackTF
+
+STEAM_ID = "76561198828172881"
+
+
+@pytest.fixture
+def server():
+    with FakeBackpackTF(STEAM_ID) as server:
+        yield server
+
+
+@pytest.fixture
+def backpack_tf(server: FakeBackpackTF) -> ExpressBackpackTF:
+    backpack_tf = ExpressBackpackTF(token="token", steam_id=STEAM_ID, api_key="key")
+    backpack_tf.URL = server.url
+    return backpack_tf
+
+
+def get_listing(sku: str, intent: str, asset_id: int = 0) -> dict:
+    currencies = {"keys": 0, "metal": 1.0}
+    return {
+        "sku": sku,
+        "intent": intent,
+        "currencies": currencies,
+        "details": "1.0 ref",
+        "asset_id": asset_id,
+    }
+
+
+def test_create_and_delete_listings(
+    server: FakeBackpackTF, backpack_tf: ExpressBackpackTF
+) -> None:
+    created = backpack_tf.create_listings(
+        [get_listing("378;6", "sell", 1), get_listing("378;6", "buy")]
+    )
+
+    assert [i.id for i in created] == ["440_1", created[1].id]
+    assert created[1].id.startswith(f"440_{STEAM_ID}_")
+    assert created[1].item["defindex"] == 378
+    assert backpack_tf.get_listings()["cursor"]["total"] == 2
+
+    backpack_tf.delete_listings([i.id for i in created])
+
+    assert server.listings == {}
+    assert server.stats["POST /v2/classifieds/listings/batch"]["calls"] == 1
+    assert server.stats["DELETE /classifieds/delete/v1"]["calls"] == 1
+
+
+def test_update_listing(server: FakeBackpackTF, backpack_tf: ExpressBackpackTF) -> None:
+    backpack_tf.create_listings([get_listing("378;6", "sell", 1)])
+    backpack_tf.update_listing("440_1", "I have 2")
+
+    assert server.listings["440_1"]["details"] == "I have 2"
+    assert server.stats["PATCH /v2/classifieds/listings/{id}"]["calls"] == 1
+
+    with pytest.raises(requests.HTTPError):
+        backpack_tf.update_listing("440_2", "I have 1")
+
+
+def test_user_agent(backpack_tf: ExpressBackpackTF) -> None:
+    assert backpack_tf.register_user_agent()["status"] == "active"
+    assert backpack_tf.stop_user_agent()["status"] == "inactive"
+
+
+def test_is_banned(server: FakeBackpackTF, backpack_tf: ExpressBackpackTF) -> None:
+    server.banned.add(STEAM_ID)
+
+    assert backpack_tf.is_banned(STEAM_ID)
+
+
+def test_rate_limited_request_is_retried(
+    server: FakeBackpackTF, backpack_tf: ExpressBackpackTF
+) -> None:
+    server.retry_after = 0.05
+    server.rate_limits = {"listings": (1, 0.05)}
+
+    backpack_tf.get_listings()
+    backpack_tf.get_listings()
+
+    assert server.stats["GET /v2/classifieds/listings"]["errors"] >= 1
+    assert server.stats["GET /v2/classifieds/listings"]["calls"] >= 3
+
+
+def test_injected_error(server: FakeBackpackTF, backpack_tf: ExpressBackpackTF) -> None:
+    server.fail_next(500)
+
+    with pytest.raises(requests.HTTPError):
+        backpack_tf.delete_all_listings()
+
+    assert backpack_tf.delete_all_listings() == {"deleted": 0}
+
+
+def test_request_needs_token(server: FakeBackpackTF) -> None:
+    backpack_tf = ExpressBackpackTF(token="", steam_id=STEAM_ID, api_key="key")
+    backpack_tf.URL = server.url
+
+    with pytest.raises(NoTokenProvided):
+        backpack_tf.delete_all_listings()
+
+    assert not server.stats
@@ -0,0 +1,33 @@
+import time
+
+from express.cache import LRUCache
+
+
+def test_lru_cache() -> None:
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    assert cache.get("a") == 1
+
+    # b is least recently used
+    cache.set("c", 3)
+
+    assert len(cache) == 2
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.pop("a") == 1
+    assert cache.get("a", "missing") == "missing"
+
+
+def test_lru_cache_ttl() -> None:
+    cache = LRUCache(ttl=0.01)
+    cache.set("a", 1)
+
+    assert cache.get("a") == 1
+
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
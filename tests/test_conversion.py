@@ -1,6 +1,10 @@
 from typing import Any
 
-from express.conversion import item_data_to_item_object
+from express.conversion import (
+    get_item_description,
+    item_data_to_item_object,
+    item_object_to_item_data,
+)
 
 
 def test_item_data_to_item_object(inventory_item_data: dict[str, Any]) -> None:
@@ -12,3 +16,25 @@ def test_item_data_to_item_object(inventory_item_data: dict[str, Any]) -> None:
     assert item.class_id == 67503
     assert item.instance_id == 11042697
     assert item.market_hash_name == "Honcho's Headgear"
+
+
+def test_descriptions_are_reused(inventory_item_data: dict[str, Any]) -> None:
+    other_item_data = inventory_item_data | {"assetid": "1"}
+    item = item_data_to_item_object(None, None, inventory_item_data)
+    other_item = item_data_to_item_object(None, None, other_item_data)
+
+    assert get_item_description(inventory_item_data) is get_item_description(
+        other_item_data
+    )
+    assert other_item.id == 1
+
+    item_data = item_object_to_item_data(item)
+    other_item_data = item_object_to_item_data(other_item)
+    item_data["sku"] = "30469;6"
+
+    assert other_item_data["assetid"] == "1"
+    assert other_item_data["tags"] is item_data["tags"]
+    assert "sku" not in other_item_data
+    assert item_data["market_hash_name"] == "Honcho's Headgear"
+    assert item_data["tags"][0]["internal_name"] == "Unique"
+    assert item_data["actions"] == inventory_item_data["actions"]
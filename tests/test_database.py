@@ -5,6 +5,7 @@ from express.exceptions import SKUNotFound
 
 database = Database("express")
 database.items.delete_many({})
+database.delete_all_listings()
 
 
 def test_get_price() -> None:
@@ -63,3 +64,29 @@ def test_update_stock() -> None:
     database.update_stock(stock)
 
     assert database.get_stock("5021;6") == (10, -1)
+
+    database.update_item_stock({"5021;6": 12})
+
+    assert database.get_stock("5021;6") == (12, -1)
+
+
+def test_listings() -> None:
+    assert database.get_listings() == {}
+
+    listing = {"id": "440_1", "sku": "5021;6", "intent": "sell", "asset_id": 1}
+    database.set_listings({"sell_5021;6": listing})
+    database.set_listings(
+        {
+            "sell_5021;6": listing | {"details": "updated"},
+            "buy_263;6": {"id": "440_7_abc", "sku": "263;6"},
+        }
+    )
+
+    assert database.get_listings() == {
+        "sell_5021;6": listing | {"details": "updated"},
+        "buy_263;6": {"id": "440_7_abc", "sku": "263;6"},
+    }
+
+    database.delete_listings(["sell_5021;6"])
+
+    assert list(database.get_listings()) == ["buy_263;6"]
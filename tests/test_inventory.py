@@ -0,0 +1,396 @@
+import asyncio
+import json
+import threading
+import time
+from copy import deepcopy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import aiohttp
+import pytest
+from tf2_utils import InvalidInventory, get_sku, map_inventory
+from tf2_utils.providers.custom import Custom
+from tf2_utils.providers.steam_supply import SteamSupply
+from tf2_utils.providers.steamcommunity import SteamCommunity
+
+from express import inventory as inventory_module
+from express.inventory import (
+    ExpressInventory,
+    IndexedInventory,
+    InventoryItem,
+    PureLedger,
+    get_provider,
+    map_inventory_chunks,
+    map_tradable_inventory,
+)
+
+
+def test_stock_index(inventory_item_data: dict, steam_id: str) -> None:
+    hat = deepcopy(inventory_item_data)
+    hat["sku"] = get_sku(hat)
+    key = {
+        "assetid": "1",
+        "classid": "101785959",
+        "instanceid": "11040578",
+        "sku": "5021;6",
+        "market_hash_name": "Mann Co. Supply Crate Key",
+    }
+
+    inventory = ExpressInventory(steam_id)
+    inventory.set_our_inventory([hat, key])
+
+    assert inventory.get_stock() == {"-100;6": 1, hat["sku"]: 1, "5021;6": 1}
+    assert inventory.get_in_stock("5021;6") == 1
+
+    second_key = key | {"assetid": "2"}
+    inventory.add_item(second_key)
+    inventory.remove_item(hat)
+
+    assert inventory.get_stock() == {"-100;6": 0, "5021;6": 2}
+    assert inventory.get_in_stock(hat["sku"]) == 0
+
+    inventory.remove_item(key)
+    inventory.remove_item(second_key)
+
+    assert inventory.get_stock() == {"-100;6": 0}
+
+
+def test_indexed_inventory() -> None:
+    def get_item(asset_id: str, sku: str, class_id: str) -> dict:
+        return {"assetid": asset_id, "sku": sku, "classid": class_id, "instanceid": "0"}
+
+    first_key = get_item("1", "5021;6", "101785959")
+    second_key = get_item("2", "5021;6", "101785959")
+    refined = get_item("3", "5002;6", "2674")
+
+    inventory = IndexedInventory([first_key, second_key, refined])
+
+    assert len(inventory) == 3
+    assert "2" in inventory and 2 in inventory
+    assert inventory.get(3) == refined
+    assert inventory.get_by_sku("5021;6") == [first_key, second_key]
+    assert inventory.get_last("5021;6") == second_key
+    assert inventory.get_last("263;6") == {}
+    assert inventory.get_same_item({"classid": 2674, "instanceid": 0}) == refined
+
+    inventory.remove(refined)
+    inventory.remove(second_key)
+
+    assert inventory.to_list() == [first_key]
+    assert not inventory.has_sku("5002;6")
+    assert inventory.get_same_item(refined) is None
+
+
+def test_inventory_items_share_descriptions(inventory_item_data: dict) -> None:
+    hat = deepcopy(inventory_item_data) | {"sku": "30469;6"}
+    second_hat = hat | {"assetid": "1"}
+    inventory = IndexedInventory([hat, second_hat])
+    first, second = inventory.values()
+
+    assert isinstance(first, InventoryItem)
+    assert first == hat and second == second_hat
+    assert first["assetid"] != second["assetid"]
+    assert first._description is second._description
+    assert "assetid" not in first._description
+
+    with pytest.raises(TypeError):
+        first["sku"] = "263;6"
+
+    copy = first.to_dict()
+    copy["picked"] = True
+
+    assert "picked" not in first
+
+    inventory.remove(first)
+    inventory.remove(second)
+
+    assert inventory._descriptions == {}
+
+
+def test_update_our_inventory(steam_id: str) -> None:
+    def get_item(asset_id: str, sku: str) -> dict:
+        return {
+            "assetid": asset_id,
+            "classid": sku.split(";")[0],
+            "instanceid": "0",
+            "sku": sku,
+            "market_hash_name": sku,
+        }
+
+    hat = get_item("1", "378;6")
+    gift = get_item("4", "5050;6")
+
+    inventory = ExpressInventory(steam_id)
+    inventory.set_our_inventory([hat, get_item("2", "263;6")])
+    changes = inventory.changes
+
+    # item 2 was moved to asset id 3, and we got a gift
+    skus = inventory.update_our_inventory([hat, get_item("3", "263;6"), gift])
+
+    assert skus == {"263;6", "5050;6"}
+    assert inventory.get_stock() == {"-100;6": 0, "378;6": 1, "263;6": 1, "5050;6": 1}
+    assert inventory.changes > changes
+    assert inventory.update_our_inventory([hat, get_item("3", "263;6"), gift]) == set()
+
+
+def test_inventory_snapshot(inventory_item_data: dict, steam_id: str, tmp_path) -> None:
+    hat = deepcopy(inventory_item_data) | {"sku": "30469;6"}
+    key = {
+        "assetid": "1",
+        "classid": "101785959",
+        "instanceid": "11040578",
+        "sku": "5021;6",
+        "market_hash_name": "Mann Co. Supply Crate Key",
+    }
+    path = tmp_path / "inventory.json"
+
+    inventory = ExpressInventory(steam_id)
+    inventory.set_our_inventory([hat, key, key | {"assetid": "2"}])
+    inventory.save_snapshot(path)
+
+    loaded = ExpressInventory(steam_id)
+
+    assert loaded.load_snapshot(path)
+    assert list(loaded.our_inventory) == list(inventory.our_inventory)
+    assert loaded.get_stock() == inventory.get_stock()
+
+    _, first_key, second_key = loaded.our_inventory
+    assert first_key._description is second_key._description
+
+    assert not ExpressInventory("1").load_snapshot(path)
+    assert not loaded.load_snapshot(tmp_path / "missing.json")
+
+    path.write_text("{")
+    assert not loaded.load_snapshot(path)
+
+
+def test_map_tradable_inventory(inventory_item_data: dict) -> None:
+    hat = deepcopy(inventory_item_data)
+    del hat["assetid"]
+    untradable = hat | {"classid": "1", "tradable": False}
+    assets = [
+        {"assetid": str(i), "classid": class_id, "instanceid": hat["instanceid"]}
+        for i, class_id in enumerate([hat["classid"], "1", hat["classid"], "2"])
+    ]
+    inventory = {"assets": assets, "descriptions": [hat, untradable]}
+    items = map_tradable_inventory(inventory)
+
+    assert items == map_inventory(inventory, add_skus=True, skip_untradable=True)
+    assert [i["assetid"] for i in items] == ["0", "2"]
+    assert [len(i) for i in map_inventory_chunks(inventory, 1)] == [1, 1]
+
+    with pytest.raises(InvalidInventory):
+        map_tradable_inventory({"success": False})
+
+
+def test_pure_ledger() -> None:
+    pure = PureLedger()
+
+    for sku in ["5021;6", "5002;6", "5002;6", "5001;6", "5000;6", "263;6"]:
+        pure.update(sku)
+
+    assert pure == PureLedger(keys=1, refined=2, reclaimed=1, scrap=1)
+    assert pure.metal_scrap == 22
+    assert pure.get_total_scrap(60 * 9) == 562
+
+    pure.update("5002;6", -1)
+
+    assert pure - PureLedger(scrap=1) == PureLedger(keys=1, refined=1, reclaimed=1)
+
+
+def test_reserve_pure(steam_id: str) -> None:
+    def get_item(asset_id: str, sku: str, name: str) -> dict:
+        return {
+            "assetid": asset_id,
+            "classid": asset_id,
+            "instanceid": "0",
+            "sku": sku,
+            "market_hash_name": name,
+        }
+
+    key = get_item("1", "5021;6", "Mann Co. Supply Crate Key")
+    refined = get_item("2", "5002;6", "Refined Metal")
+    second_refined = get_item("3", "5002;6", "Refined Metal")
+
+    inventory = ExpressInventory(steam_id)
+    inventory.set_our_inventory([key, refined, second_refined])
+
+    assert inventory.get_pure() == PureLedger(keys=1, refined=2)
+
+    inventory.reserve_pure("123", [refined])
+
+    assert inventory.get_pure() == PureLedger(keys=1, refined=1)
+    assert inventory.get_reserved_pure() == PureLedger(refined=1)
+    assert inventory.get_unreserved_inventory() == [key, second_refined]
+
+    inventory.release_pure("123")
+
+    assert inventory.get_pure() == PureLedger(keys=1, refined=2)
+    assert inventory.get_unreserved_inventory() == [key, refined, second_refined]
+
+    # offers mark the items they pick, which must not change our inventory
+    inventory.get_unreserved_inventory()[0]["picked"] = True
+
+    assert "picked" not in inventory.get_our_item("1")
+
+
+@pytest.fixture
+def inventory_server(inventory_item_data: dict):
+    """Fails the first request for every steam id, then serves one item"""
+    asset = {
+        key: inventory_item_data[key] for key in ["assetid", "classid", "instanceid"]
+    }
+    body = json.dumps({"assets": [asset], "descriptions": [inventory_item_data]})
+    failed = set()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args) -> None:
+            pass
+
+        def do_GET(self) -> None:
+            steam_id = self.path.split("/")[2]
+            time.sleep(0.2)
+
+            if steam_id not in failed:
+                failed.add(steam_id)
+                self.send_response(429)
+                self.end_headers()
+                self.wfile.write(b"null")
+                return
+
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(body.encode())
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    # cancelled requests close the connection early
+    server.handle_error = lambda *args: None
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_inventories_concurrently(
+    inventory_server: str, steam_id: str, monkeypatch
+) -> None:
+    monkeypatch.setattr(inventory_module.random, "uniform", lambda a, b: 0.0)
+    inventory = ExpressInventory(steam_id)
+    inventory.provider = Custom("", inventory_server)
+
+    async def fetch() -> list:
+        return await asyncio.gather(
+            inventory.fetch_our_inventory(), inventory._fetch_inventory("1")
+        )
+
+    start = time.monotonic()
+    ours, theirs = asyncio.run(fetch())
+
+    # both failed once and were retried, but did not wait on each other
+    assert time.monotonic() - start < 0.7
+    assert len(ours) == len(theirs) == 1
+    assert inventory.get_in_stock(theirs[0]["sku"]) == 1
+
+
+def test_fetch_inventory_is_cancelled(inventory_server: str, steam_id: str) -> None:
+    inventory = ExpressInventory(steam_id)
+    inventory.provider = Custom("", inventory_server)
+
+    async def fetch() -> None:
+        task = asyncio.create_task(inventory.fetch_their_inventory("2"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await task
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(fetch())
+
+
+def test_race_inventory_providers(inventory_item_data: dict, steam_id: str) -> None:
+    asset = {
+        key: inventory_item_data[key] for key in ["assetid", "classid", "instanceid"]
+    }
+    body = {"assets": [asset], "descriptions": [inventory_item_data]}
+    inventory = ExpressInventory(
+        steam_id,
+        providers=[
+            {"provider": f"http://{name}", "api_key": "key"}
+            for name in ["broken", "slow", "fast"]
+        ],
+        hedge_delay=0.1,
+    )
+
+    async def fetch_async(steam_id: str, provider: Custom) -> dict:
+        if provider.url == "http://broken":
+            raise aiohttp.ClientError("Broken provider")
+
+        if provider.url == "http://slow":
+            await asyncio.sleep(1.0)
+
+        return body
+
+    inventory.fetch_async = fetch_async
+
+    # the broken provider fails at once, fast is asked once slow is too slow
+    start = time.monotonic()
+    items = asyncio.run(inventory._race_providers(steam_id))
+
+    assert time.monotonic() - start < 0.5
+    assert items[0]["assetid"] == asset["assetid"]
+    assert inventory.get_provider_stats("http://broken").failures == 1
+    assert inventory.get_provider_stats("http://fast").requests == 1
+    assert inventory.get_provider_stats("http://slow").requests == 0
+
+    for _ in range(2):
+        asyncio.run(inventory._race_providers(steam_id))
+
+    # slow lost every race it was in, so it is asked after fast
+    assert [name for name, _ in inventory.get_providers()] == [
+        "http://fast",
+        "http://slow",
+        "http://broken",
+    ]
+
+
+def test_unexpected_provider_error_is_a_miss(
+    inventory_item_data: dict, steam_id: str
+) -> None:
+    asset = {
+        key: inventory_item_data[key] for key in ["assetid", "classid", "instanceid"]
+    }
+    body = {"assets": [asset], "descriptions": [inventory_item_data]}
+    inventory = ExpressInventory(
+        steam_id,
+        providers=[
+            {"provider": f"http://{name}", "api_key": "key"}
+            for name in ["broken", "working"]
+        ],
+    )
+
+    async def fetch_async(steam_id: str, provider: Custom) -> dict:
+        if provider.url == "http://broken":
+            raise KeyError("assets")
+
+        return body
+
+    inventory.fetch_async = fetch_async
+    items = asyncio.run(inventory._race_providers(steam_id))
+
+    assert items[0]["assetid"] == asset["assetid"]
+    assert inventory.get_provider_stats("http://broken").failures == 1
+
+
+def test_get_provider() -> None:
+    assert isinstance(get_provider("steamcommunity"), SteamCommunity)
+    assert isinstance(get_provider("steamsupply", "key"), SteamSupply)
+
+    with pytest.raises(ValueError):
+        get_provider("steamsupply")
+
+    with pytest.raises(ValueError):
+        get_provider("steamsuply", "key")
+
+    # only inventory_providers are checked, inventory_provider falls back
+    assert isinstance(ExpressInventory("1", "steamsupply").provider, SteamCommunity)
+
+    with pytest.raises(ValueError):
+        ExpressInventory("1", providers=[{"provider": "steamsupply"}])
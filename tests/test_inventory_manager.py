@@ -0,0 +1,223 @@
+import asyncio
+import threading
+from dataclasses import replace
+from pathlib import Path
+from typing import Awaitable
+
+from steam import TradeOfferReceipt
+from tf2_utils import CurrencyExchange, get_sku
+
+from express.inventory import IndexedInventory
+from express.managers.inventory_manager import InventoryManager
+from express.options import Options
+
+from .mock.database import Database
+from .mock.express import Express
+
+
+def test_partner_inventory_cache(client: Express) -> None:
+    inventory_manager = InventoryManager(client)
+    inventory_manager.setup()
+    fetched = []
+
+    async def fetch_inventory(steam_id: str) -> list[dict]:
+        fetched.append(steam_id)
+        return [{"assetid": "1"}, {"assetid": "2"}]
+
+    inventory_manager._fetch_inventory = fetch_inventory
+
+    async def fetch() -> list[dict]:
+        return await inventory_manager.fetch_partner_inventory("1")
+
+    inventory = asyncio.run(fetch())
+    inventory.reverse()
+
+    assert asyncio.run(fetch()) == [{"assetid": "1"}, {"assetid": "2"}]
+    assert fetched == ["1"]
+
+    inventory_manager.invalidate_partner_inventory("1")
+    asyncio.run(fetch())
+
+    assert fetched == ["1", "1"]
+
+
+def test_cached_partner_inventory_is_not_marked(
+    client: Express, inventory_item_data: dict
+) -> None:
+    inventory_manager = InventoryManager(client)
+    inventory_manager.setup()
+    refined = [
+        inventory_item_data | {"assetid": str(i), "market_hash_name": "Refined Metal"}
+        for i in range(2)
+    ]
+
+    async def fetch_inventory(steam_id: str) -> list[dict]:
+        return refined
+
+    inventory_manager._fetch_inventory = fetch_inventory
+
+    # two offers in a row where they pay 2 refined
+    for _ in range(2):
+        their_inventory = asyncio.run(inventory_manager.fetch_partner_inventory("1"))
+        currencies = CurrencyExchange(their_inventory, [], "sell", 18, 540)
+        currencies.calculate()
+        their_metal, _ = currencies.get_currencies()
+
+        assert currencies.is_possible
+        assert len(their_metal) == 2
+
+
+def test_refresh_our_inventory(steam_id: str, options: Options) -> None:
+    options = replace(options, use_backpack_tf=False, inventory_snapshot=False)
+    client = Express(steam_id, options)
+    client.database = Database([{"sku": "263;6", "in_stock": 1}])
+    inventory_manager = InventoryManager(client)
+    inventory_manager.setup()
+
+    def get_item(asset_id: str) -> dict:
+        return {
+            "assetid": asset_id,
+            "classid": "263",
+            "instanceid": "0",
+            "sku": "263;6",
+            "market_hash_name": "Ellis' Cap",
+        }
+
+    inventory_manager.set_our_inventory([get_item("1")])
+    fetched = [get_item("1"), get_item("2")]
+
+    async def fetch_inventory(steam_id: str) -> list[dict]:
+        return fetched
+
+    inventory_manager._fetch_inventory = fetch_inventory
+
+    assert asyncio.run(inventory_manager.refresh_our_inventory()) == {"263;6"}
+    assert client.database.get_item("263;6")["in_stock"] == 2
+
+    async def fetch_during_trade(steam_id: str) -> list[dict]:
+        inventory_manager.remove_item(get_item("2"))
+        return fetched
+
+    inventory_manager._fetch_inventory = fetch_during_trade
+
+    # the fetch does not include the trade, so it is not applied
+    assert asyncio.run(inventory_manager.refresh_our_inventory()) is None
+    assert inventory_manager.get_in_stock("263;6") == 1
+
+
+def test_start_from_inventory_snapshot(
+    steam_id: str, options: Options, tmp_path
+) -> None:
+    client = Express(steam_id, replace(options, use_backpack_tf=False))
+    client.database = Database([{"sku": "263;6", "in_stock": 1}])
+    inventory_manager = InventoryManager(client)
+    inventory_manager.setup()
+    inventory_manager._snapshot_file = tmp_path / "inventory.json"
+
+    def get_item(asset_id: str) -> dict:
+        return {
+            "assetid": asset_id,
+            "classid": "263",
+            "instanceid": "0",
+            "sku": "263;6",
+            "market_hash_name": "Ellis' Cap",
+        }
+
+    fetched = [get_item("1")]
+
+    async def fetch_inventory(steam_id: str) -> list[dict]:
+        return fetched
+
+    async def run_and_save(manager: InventoryManager, coro: Awaitable) -> None:
+        await coro
+        await manager._snapshot_task
+
+    inventory_manager.snapshot_save_delay = 0
+    inventory_manager._fetch_inventory = fetch_inventory
+    asyncio.run(
+        run_and_save(inventory_manager, inventory_manager.fetch_our_inventory())
+    )
+
+    # restarted, and we got another cap while offline
+    restarted = InventoryManager(client)
+    restarted.setup()
+    restarted._snapshot_file = inventory_manager._snapshot_file
+    restarted.snapshot_save_delay = 0
+    restarted._fetch_inventory = fetch_inventory
+    fetched = [get_item("1"), get_item("2")]
+
+    assert restarted.load_inventory_snapshot()
+    assert restarted.get_in_stock("263;6") == 1
+
+    asyncio.run(run_and_save(restarted, restarted.validate_inventory_snapshot()))
+
+    assert restarted.get_in_stock("263;6") == 2
+    assert client.database.get_item("263;6")["in_stock"] == 2
+
+    restarted.load_inventory_snapshot()
+
+    assert restarted.get_in_stock("263;6") == 2
+
+
+def test_inventory_snapshot_saves_are_coalesced(
+    steam_id: str, options: Options, tmp_path
+) -> None:
+    client = Express(steam_id, replace(options, use_backpack_tf=False))
+    client.database = Database([{"sku": "263;6", "in_stock": 0}])
+    inventory_manager = InventoryManager(client)
+    inventory_manager.setup()
+    inventory_manager._snapshot_file = tmp_path / "inventory.json"
+    inventory_manager.snapshot_save_delay = 0.05
+    write_snapshot = inventory_manager.write_snapshot
+    writes = []
+
+    def record_write_snapshot(snapshot: dict, path: Path) -> None:
+        writes.append((threading.get_ident(), len(snapshot["items"])))
+        write_snapshot(snapshot, path)
+
+    inventory_manager.write_snapshot = record_write_snapshot
+
+    async def receive_items() -> None:
+        for i in range(3):
+            item = {
+                "assetid": str(i),
+                "classid": "263",
+                "instanceid": "0",
+                "sku": "263;6",
+                "market_hash_name": "Ellis' Cap",
+            }
+            inventory_manager.add_item(item)
+            inventory_manager.save_inventory_snapshot()
+
+        await inventory_manager._snapshot_task
+
+    inventory_manager._our_items = IndexedInventory()
+    asyncio.run(receive_items())
+
+    # one write with every item, done in a thread
+    assert len(writes) == 1
+    assert writes[0][0] != threading.get_ident()
+    assert writes[0][1] == 3
+    assert inventory_manager.load_inventory_snapshot()
+    assert inventory_manager.get_in_stock("263;6") == 3
+
+
+def test_received_items_without_new_asset_id(
+    steam_id: str, options: Options, inventory_item_data: dict
+) -> None:
+    options = replace(options, use_backpack_tf=False, inventory_snapshot=False)
+    client = Express(steam_id, options)
+    client.database = Database([])
+    inventory_manager = InventoryManager(client)
+    inventory_manager.setup()
+    inventory_manager._our_items = IndexedInventory()
+    sku = get_sku(inventory_item_data)
+    receipt = TradeOfferReceipt(sent=[], received=[])
+
+    for _ in range(2):
+        their_items = [dict(inventory_item_data), dict(inventory_item_data)]
+        asyncio.run(
+            inventory_manager.update_inventory_with_receipt(their_items, [], receipt)
+        )
+
+    assert inventory_manager.get_in_stock(sku) == 4
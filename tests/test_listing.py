@@ -0,0 +1,169 @@
+from backpack_tf import Listing
+from tf2_sku import from_sku, to_sku
+
+from express.inventory import PureLedger
+from express.listing import (
+    ListingConstruct,
+    ListingSnapshot,
+    ListingTemplate,
+    get_listing_changes,
+    get_listing_key,
+    get_matching_listing,
+    index_listings,
+    listing_item_to_sku,
+)
+
+
+def get_construct(sku: str, intent: str, metal: float, asset_id: int = 0):
+    currencies = {"keys": 0, "metal": metal}
+    return ListingConstruct(sku, intent, currencies, f"{metal} ref", asset_id, {})
+
+
+def get_current_listing(construct: ListingConstruct) -> dict:
+    return {"id": f"440_{construct.sku}"} | construct.listing
+
+
+def test_get_listing_changes() -> None:
+    unchanged = get_construct("5021;6", "buy", 60.0)
+    repriced = get_construct("263;6", "buy", 1.0)
+    moved = get_construct("263;6", "sell", 2.0, asset_id=2)
+    new = get_construct("30469;1", "sell", 5.0, asset_id=3)
+    restocked = get_construct("5021;6", "sell", 61.0, asset_id=4)
+
+    current = {
+        get_listing_key("buy", "5021;6"): get_current_listing(unchanged),
+        get_listing_key("buy", "263;6"): get_current_listing(
+            get_construct("263;6", "buy", 0.88)
+        ),
+        get_listing_key("sell", "263;6"): get_current_listing(
+            get_construct("263;6", "sell", 2.0, asset_id=1)
+        ),
+        get_listing_key("buy", "30469;1"): get_current_listing(
+            get_construct("30469;1", "buy", 4.0)
+        ),
+        get_listing_key("sell", "5021;6"): get_current_listing(restocked)
+        | {"details": "I have 1"},
+    }
+    desired = {
+        get_listing_key(i.intent, i.sku): i
+        for i in [unchanged, repriced, moved, new, restocked]
+    }
+
+    to_create, to_update, to_delete = get_listing_changes(desired, current)
+
+    assert to_create == [repriced, moved, new]
+    assert to_update == [restocked]
+    assert [(i["intent"], i["sku"], i["asset_id"]) for i in to_delete] == [
+        ("sell", "263;6", 1),
+        ("buy", "30469;1", 0),
+    ]
+
+
+def test_get_listing_changes_nothing_changed() -> None:
+    construct = get_construct("5021;6", "sell", 61.0, asset_id=1)
+    key = get_listing_key("sell", "5021;6")
+
+    assert get_listing_changes(
+        {key: construct}, {key: get_current_listing(construct)}
+    ) == ([], [], [])
+
+
+def get_listing(listing_id: str, intent: str, item: dict, status: str = "active"):
+    return Listing(listing_id, "7", 440, {}, {}, "", 0, 0, intent, 1, status, "", item)
+
+
+def test_listing_item_to_sku() -> None:
+    assert listing_item_to_sku({"defindex": 263, "quality": {"id": 6}}) == "263;6"
+    assert (
+        listing_item_to_sku(
+            {
+                "defindex": 30420,
+                "quality": {"id": 5},
+                "particle": {"id": 702},
+                "elevatedQuality": {"id": 11},
+                "craftable": False,
+                "killstreakTier": 3,
+                "australium": True,
+                "festivized": True,
+                "wearTier": None,
+            }
+        )
+        == "30420;5;u702;australium;uncraftable;strange;kt-3;festive"
+    )
+    assert (
+        listing_item_to_sku(
+            {
+                "defindex": 20002,
+                "quality": {"id": 6},
+                "killstreakTier": 3,
+                "target": {"defindex": 1071},
+                "output": {"defindex": 6523},
+                "outputQuality": {"id": 6},
+            }
+        )
+        == "20002;6;kt-3;td-1071;od-6523;oq-6"
+    )
+    assert listing_item_to_sku(
+        {"defindex": 5021, "quality": {"id": 6}, "craftNumber": 5}
+    ) == to_sku(from_sku("5021;6;n5"))
+
+
+def test_get_matching_listing() -> None:
+    killstreak = get_listing(
+        "440_7_a", "buy", {"defindex": 200, "quality": {"id": 6}, "killstreakTier": 1}
+    )
+    plain = get_listing("440_7_b", "buy", {"defindex": 200, "quality": {"id": 6}})
+    inactive = get_listing(
+        "440_7_c", "buy", {"defindex": 263, "quality": {"id": 6}}, "notEnoughCurrency"
+    )
+    sold = get_listing("440_5", "sell", {"defindex": 200, "quality": {"id": 6}})
+    listings = index_listings([killstreak, plain, inactive, sold])
+
+    def match(sku: str, intent: str, asset_id: int = 0) -> Listing | None:
+        construct = get_construct(sku, intent, 1.0, asset_id)
+        return get_matching_listing(construct, listings)
+
+    assert match("200;6;kt-1", "buy") == killstreak
+    assert match("200;6", "buy") == plain
+    assert match("263;6", "buy") is None
+    assert match("200;6", "sell", 5) == sold
+    assert match("200;6", "sell", 6) is None
+
+
+def test_listing_snapshot() -> None:
+    priced = {"sku": "263;6", "buy": {"metal": 1.0}, "sell": {"metal": 1.11}}
+    unpriced = {"sku": "5021;6", "buy": {}, "sell": {}}
+    snapshot = ListingSnapshot(
+        {"263;6": priced, "5021;6": unpriced},
+        {"263;6": 2},
+        PureLedger(keys=1, refined=2),
+        key_scrap_price=540,
+    )
+
+    assert snapshot.priced_skus == {"263;6"}
+    assert snapshot.get_in_stock("263;6") == 2
+    assert snapshot.get_in_stock("5021;6") == 0
+    assert snapshot.has_enough_pure(1, 2.0)
+    assert not snapshot.has_enough_pure(1, 2.11)
+
+    snapshot.key_scrap_price = None
+    assert not snapshot.has_enough_pure(0, 0.11)
+
+
+def test_listing_template() -> None:
+    template = ListingTemplate(
+        {
+            "sku": "263;6",
+            "max_stock": 2,
+            "formatted_identifier": "ellis_cap",
+            "max_stock_string": "2",
+        }
+    )
+    details = template.get_details("buy", "1.0 ref", 1)
+
+    assert details.startswith("1.0 ref ⚡️ Stock 1/2 ⚡️")
+    assert details.endswith("sell_ellis_cap")
+    assert template.get_details("sell", "1.11 ref", 3).startswith(
+        "1.11 ref ⚡️ I have 3"
+    )
+    assert template.get_variables("1.0 ref", 1)["in_stock"] == 1
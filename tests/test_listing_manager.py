@@ -1,5 +1,14 @@
+import asyncio
+import threading
+import time
+from dataclasses import replace
+
+from express.listing import ListingConstruct
 from express.managers.listing_manager import ListingManager
+from express.scheduler import TokenBucket
 
+from .mock.backpack_tf import FakeBackpackTF
+from .mock.database import Database
 from .mock.express import Express
 
 listing_manager: ListingManager = None
@@ -10,8 +19,143 @@ def test_listing_manager_setup(client: Express) -> None:
     listing_manager = ListingManager(client)
     listing_manager.setup()
 
-    assert not listing_manager._is_ready
+    assert not listing_manager._ready.is_set()
 
 
 def test_set_user_agent() -> None:
     assert listing_manager.set_user_agent()
+
+
+def test_dirty_skus() -> None:
+    listing_manager.set_price_changed("263;6")
+    listing_manager.set_inventory_changed({"30469;1"})
+
+    assert listing_manager._has_changes.is_set()
+    assert listing_manager._pop_dirty_skus() == {"263;6", "30469;1"}
+    assert listing_manager._pop_dirty_skus() == set()
+
+    listing_manager.set_inventory_changed()
+    listing_manager.set_price_changed("263;6")
+
+    assert listing_manager._pop_dirty_skus() is None
+
+
+def get_listing_manager(
+    client: Express, server: FakeBackpackTF, persist_listings: bool = False
+) -> ListingManager:
+    options = replace(client.options, persist_listings=persist_listings)
+    express = Express(client.steam_id, options)
+    express.database = Database([])
+    listing_manager = ListingManager(express)
+    listing_manager.setup()
+    listing_manager.backpack_tf.URL = server.url
+    return listing_manager
+
+
+def get_construct(sku: str, intent: str, asset_id: int = 0) -> ListingConstruct:
+    currencies = {"keys": 0, "metal": 1.0}
+    return ListingConstruct(sku, intent, currencies, "1.0 ref", asset_id, {})
+
+
+def test_backpack_tf_calls_do_not_block_loop(client: Express) -> None:
+    constructs = [get_construct("378;6", "sell", 1), get_construct("263;6", "sell", 2)]
+
+    async def measure_loop_lag(listing_manager: ListingManager) -> float:
+        max_lag = 0.0
+        task = asyncio.gather(
+            listing_manager._create_listings(constructs[:1]),
+            listing_manager._create_listings(constructs[1:]),
+        )
+
+        while not task.done():
+            start = time.monotonic()
+            await asyncio.sleep(0.01)
+            max_lag = max(max_lag, time.monotonic() - start - 0.01)
+
+        assert await task == [1, 1]
+
+        task = asyncio.ensure_future(
+            listing_manager._delete_listings(list(listing_manager._listings.values()))
+        )
+
+        while not task.done():
+            start = time.monotonic()
+            await asyncio.sleep(0.01)
+            max_lag = max(max_lag, time.monotonic() - start - 0.01)
+
+        return max_lag
+
+    with FakeBackpackTF(client.steam_id, latency=0.3) as server:
+        listing_manager = get_listing_manager(client, server)
+        listing_manager.backpack_tf.scheduler.buckets["batch"] = TokenBucket(1000, 10)
+
+        assert asyncio.run(measure_loop_lag(listing_manager)) < 0.1
+        assert server.listings == {}
+        assert listing_manager._listings == {}
+
+
+def test_timed_out_listing_requests_are_not_sent(client: Express) -> None:
+    with FakeBackpackTF(client.steam_id) as server:
+        listing_manager = get_listing_manager(client, server)
+        backpack_tf = listing_manager.backpack_tf
+        backpack_tf.timeout = 0.1
+        # batch requests are out of tokens for a long time
+        backpack_tf.scheduler.buckets["batch"] = TokenBucket(0.001, 0)
+
+        created = asyncio.run(
+            listing_manager._create_listings([get_construct("378;6", "sell", 1)])
+        )
+        asyncio.run(
+            listing_manager._delete_listings(
+                [{"id": "440_1", "intent": "sell", "sku": "378;6"}]
+            )
+        )
+        backpack_tf.scheduler.buckets["batch"] = TokenBucket(1000, 10)
+        time.sleep(0.1)
+
+        assert created == 0
+        assert len(backpack_tf.scheduler) == 0
+        assert server.get_total("calls") == 0
+
+
+def test_listings_are_saved_once_per_batch(client: Express) -> None:
+    constructs = [get_construct("378;6", "sell", 1), get_construct("263;6", "sell", 2)]
+    writes = []
+
+    with FakeBackpackTF(client.steam_id) as server:
+        listing_manager = get_listing_manager(client, server, persist_listings=True)
+        database = listing_manager.database
+        set_listings = database.set_listings
+
+        def record_set_listings(listings: dict[str, dict]) -> None:
+            writes.append((threading.get_ident(), sorted(listings)))
+            set_listings(listings)
+
+        database.set_listings = record_set_listings
+
+        assert asyncio.run(listing_manager._create_listings(constructs)) == 2
+
+    # one write for the batch, done in a thread
+    assert len(writes) == 1
+    assert writes[0][0] != threading.get_ident()
+    assert writes[0][1] == ["sell_263;6", "sell_378;6"]
+    assert database.get_listings() == listing_manager._listings
+
+
+def test_failed_restore_deletes_listings(client: Express) -> None:
+    with FakeBackpackTF(client.steam_id) as server:
+        listing_manager = get_listing_manager(client, server, persist_listings=True)
+        listing_manager.set_user_agent = lambda: True
+        listing_manager.database.set_listings({"buy_263;6": {"id": "440_7_a"}})
+        # fetching our listings fails
+        server.fail_next(500)
+
+        async def run() -> None:
+            task = asyncio.create_task(listing_manager.run())
+            await asyncio.wait_for(listing_manager.wait_until_ready(), 5)
+            task.cancel()
+
+        asyncio.run(run())
+
+        assert listing_manager.database.get_listings() == {}
+        assert server.stats["DELETE /v2/classifieds/listings"]["calls"] == 1
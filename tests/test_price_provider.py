@@ -1,7 +1,11 @@
+import threading
+import time
+
 import pytest
 
 from express.pricers.pricedb import PriceDB
 from express.pricers.prices_tf import PricesTF
+from express.pricers.pricing_provider import PricingProvider
 from express.pricers.pricing_providers import get_pricing_provider
 from express.utils import has_correct_price_format
 
@@ -13,6 +17,20 @@ def callback(data: dict) -> None:
 provider = get_pricing_provider("pricedb", callback)
 
 
+class SlowProvider(PricingProvider):
+    def __init__(self) -> None:
+        super().__init__(callback)
+        self.requests = 0
+
+    def get_price(self, sku: str) -> dict:
+        self.requests += 1
+        time.sleep(0.05)
+        return {"sku": sku, "buy": {"metal": 1.0}, "sell": {"metal": 1.11}}
+
+    def get_multiple_prices(self, skus: list[str]) -> dict:
+        return {sku: self.get_price(sku) for sku in skus}
+
+
 def test_pricing_provider() -> None:
     assert isinstance(provider, PriceDB)
     assert isinstance(get_pricing_provider("PriceDB", callback), PriceDB)
@@ -34,3 +52,75 @@ def test_get_multiple_prices() -> None:
 
     for sku in prices:
         assert has_correct_price_format(prices[sku])
+
+
+def test_request_price_single_flight() -> None:
+    slow_provider = SlowProvider()
+    results = []
+
+    def request() -> None:
+        results.append(slow_provider.request_price("263;6"))
+
+    threads = [threading.Thread(target=request) for _ in range(5)]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 5
+    assert slow_provider.requests == 1
+
+    # served from cache
+    slow_provider.request_price("263;6")
+    assert slow_provider.requests == 1
+
+
+def test_request_multiple_prices_uses_cache() -> None:
+    slow_provider = SlowProvider()
+    slow_provider.request_price("263;6")
+
+    prices = slow_provider.request_multiple_prices(["263;6", "5021;6"])
+
+    assert list(prices) == ["263;6", "5021;6"]
+    assert slow_provider.requests == 2
+
+
+def test_chunks_are_capped_at_bulk_limit() -> None:
+    pricedb = PriceDB(callback)
+    requested = []
+
+    def get_items_bulk(skus: list[str]) -> list[dict]:
+        requested.append(len(skus))
+        return [{"sku": sku} for sku in skus]
+
+    pricedb.get_items_bulk = get_items_bulk
+    skus = [f"{i};6" for i in range(120)]
+    chunks = list(pricedb.iter_multiple_prices(skus, 100))
+
+    # the schema is never downloaded
+    assert requested == [50, 50, 20]
+    assert sorted(sku for chunk in chunks for sku in chunk) == sorted(skus)
+
+
+def test_prices_tf_chunks_use_cache() -> None:
+    prices_tf = PricesTF(callback)
+    requested = []
+
+    def get_price(sku: str) -> dict:
+        requested.append(sku)
+        return {"sku": sku, "buy": {"metal": 1.0}, "sell": {"metal": 1.11}}
+
+    prices_tf.get_price = get_price
+    prices_tf.get_prices_till_page = lambda page_limit: {
+        "5021;6": {"buy": {"metal": 60.0}, "sell": {"metal": 60.11}}
+    }
+    prices_tf.request_price("263;6")
+    chunks = list(prices_tf.iter_multiple_prices(["5021;6", "263;6", "378;6"]))
+
+    assert [list(chunk) for chunk in chunks] == [["5021;6"], ["263;6", "378;6"]]
+    assert requested == ["263;6", "378;6"]
+    # startup prices are cached for requests made meanwhile
+    assert prices_tf.request_price("5021;6")["sell"]["metal"] == 60.11
+    assert requested == ["263;6", "378;6"]
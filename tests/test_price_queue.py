@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from express.pricers.price_queue import PriceEventQueue
+
+
+def price(sku: str, metal: float) -> dict:
+    return {"sku": sku, "buy": {"metal": metal}, "sell": {"metal": metal + 1}}
+
+
+def test_invalid_policy() -> None:
+    with pytest.raises(ValueError):
+        PriceEventQueue(policy="invalid")
+
+
+def test_merge_policy() -> None:
+    queue = PriceEventQueue(maxsize=2, policy="merge")
+    queue.put(price("5021;6", 60.0))
+    queue.put(price("263;6", 1.0))
+    queue.put(price("5021;6", 61.0))
+
+    assert len(queue) == 2
+    assert queue.merged == 1
+
+    # full, oldest sku is dropped
+    queue.put(price("30469;1", 5.0))
+
+    assert queue.dropped == 1
+    assert asyncio.run(queue.get()) == price("263;6", 1.0)
+    assert asyncio.run(queue.get()) == price("30469;1", 5.0)
+    assert len(queue) == 0
+
+
+def test_merge_keeps_position() -> None:
+    queue = PriceEventQueue(policy="merge")
+    queue.put(price("5021;6", 60.0))
+    queue.put(price("263;6", 1.0))
+    queue.put(price("5021;6", 61.0))
+
+    assert asyncio.run(queue.get()) == price("5021;6", 61.0)
+
+
+def test_drop_policies() -> None:
+    oldest = PriceEventQueue(maxsize=2, policy="drop_oldest")
+    newest = PriceEventQueue(maxsize=2, policy="drop_newest")
+
+    for queue in [oldest, newest]:
+        queue.put(price("5021;6", 60.0))
+        queue.put(price("5021;6", 61.0))
+        queue.put(price("5021;6", 62.0))
+
+        assert len(queue) == 2
+        assert queue.dropped == 1
+
+    assert asyncio.run(oldest.get()) == price("5021;6", 61.0)
+    assert asyncio.run(newest.get()) == price("5021;6", 60.0)
+
+
+def test_get_waits_for_put() -> None:
+    async def run() -> dict:
+        queue = PriceEventQueue()
+        asyncio.get_running_loop().call_later(0.01, queue.put, price("263;6", 1.0))
+        data = await asyncio.wait_for(queue.get(), 1)
+
+        metrics = queue.get_metrics()
+        assert metrics["depth"] == 0
+        assert metrics["processed"] == 1
+        assert metrics["last_event_age"] >= 0
+
+        return data
+
+    assert asyncio.run(run()) == price("263;6", 1.0)
+
+
+def test_get_many() -> None:
+    queue = PriceEventQueue(policy="drop_oldest")
+
+    for metal in [1.0, 2.0, 3.0]:
+        queue.put(price("263;6", metal))
+
+    assert asyncio.run(queue.get_many(2)) == [price("263;6", 1.0), price("263;6", 2.0)]
+    assert asyncio.run(queue.get_many(2)) == [price("263;6", 3.0)]
+    assert queue.get_metrics()["processed"] == 3
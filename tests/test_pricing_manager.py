@@ -0,0 +1,155 @@
+import asyncio
+import threading
+from dataclasses import replace
+from typing import Iterator
+
+from express.managers.pricing_manager import PricingManager
+from express.options import Options
+
+from .mock.database import Database
+from .mock.express import Express
+
+KEY_PRICE = {"buy": {"keys": 0, "metal": 60.0}, "sell": {"keys": 0, "metal": 60.11}}
+
+
+def get_item(sku: str, metal: float) -> dict:
+    return {
+        "sku": sku,
+        "buy": {"keys": 0, "metal": metal},
+        "sell": {"keys": 0, "metal": metal + 0.11},
+        "autoprice": True,
+    }
+
+
+def get_pricing_manager(
+    steam_id: str, options: Options, items: list[dict], **kwargs
+) -> PricingManager:
+    options = replace(options, use_backpack_tf=False, **kwargs)
+    client = Express(steam_id, options)
+    client.are_prices_updated = False
+    client.database = Database(items)
+    pricing_manager = PricingManager(client)
+    pricing_manager.setup()
+    return pricing_manager
+
+
+def test_failed_chunks_do_not_block_trading(steam_id: str, options: Options) -> None:
+    items = [{"sku": "5021;6", "autoprice": True}, get_item("263;6", 1.0)]
+    items += [get_item("378;6", 1.0)]
+    pricing_manager = get_pricing_manager(steam_id, options, items)
+
+    def iter_multiple_prices(skus: list[str], chunk_size: int) -> Iterator[dict]:
+        yield {"263;6": "not a price"}
+        yield {"5021;6": KEY_PRICE}
+        raise ConnectionError("Provider went away")
+
+    pricing_manager.provider.iter_multiple_prices = iter_multiple_prices
+
+    async def update() -> None:
+        await pricing_manager.update_pricelist()
+        await asyncio.wait_for(
+            pricing_manager.wait_for_prices(["5021;6", "263;6", "378;6"]), 1
+        )
+
+    asyncio.run(update())
+
+    # the invalid chunk is skipped and the next one is used
+    assert pricing_manager.database.get_item("5021;6")["sell"] == KEY_PRICE["sell"]
+    assert pricing_manager.database.get_item("263;6")["buy"]["metal"] == 1.0
+
+
+def test_refresh_stale_prices_keeps_running(steam_id: str, options: Options) -> None:
+    items = [{"sku": "5021;6", "autoprice": True} | KEY_PRICE]
+    items += [get_item("263;6", 1.0), get_item("378;6", 1.0)]
+    pricing_manager = get_pricing_manager(
+        steam_id, options, items, price_refresh_requests_per_minute=6000
+    )
+    pricing_manager.set_autopriced_items(pricing_manager.database.get_autopriced())
+    # removed from the pricelist while it was queued
+    del pricing_manager.database.items["263;6"]
+    requested = []
+
+    def request_price(sku: str) -> dict:
+        requested.append(sku)
+
+        if sku == "5021;6":
+            raise KeyError("buy")
+
+        return get_item(sku, 2.0)
+
+    pricing_manager.provider.request_price = request_price
+
+    async def refresh() -> None:
+        task = asyncio.create_task(pricing_manager.refresh_stale_prices())
+        await asyncio.sleep(0.2)
+
+        assert not task.done()
+        task.cancel()
+
+    asyncio.run(refresh())
+
+    assert "263;6" not in requested and "263;6" not in pricing_manager.refresh_queue
+    assert sorted(requested) == ["378;6", "5021;6"]
+    assert pricing_manager.database.get_item("378;6")["buy"]["metal"] == 2.0
+
+
+def test_rules_use_provider_key_price(steam_id: str, options: Options) -> None:
+    rules = [
+        {"sku": "5021;6", "sell_scrap": 9},
+        {"sku": "30469;1", "buy_scrap": -1},
+    ]
+    items = [{"sku": "5021;6", "autoprice": True}, get_item("30469;1", 1.0)]
+    pricing_manager = get_pricing_manager(steam_id, options, items, pricing_rules=rules)
+    price = {"keys": 0, "metal": 60.56}
+
+    pricing_manager.update_prices({"5021;6": KEY_PRICE})
+    pricing_manager.update_prices({"30469;1": {"buy": price, "sell": price}})
+
+    # the stored key has the markup, but a key is still worth 60.11 ref
+    assert pricing_manager.get_key_prices()["sell"]["metal"] == 61.11
+    assert pricing_manager.get_item("30469;1")["sell"] == {"keys": 1, "metal": 0.55}
+
+
+def test_price_updates_are_written_off_the_loop(
+    steam_id: str, options: Options
+) -> None:
+    items = [{"sku": "5021;6", "autoprice": True} | KEY_PRICE]
+    items += [get_item("263;6", 1.0), get_item("378;6", 1.0)]
+    pricing_manager = get_pricing_manager(steam_id, options, items)
+    pricing_manager.set_autopriced_items(pricing_manager.database.get_autopriced())
+    database = pricing_manager.database
+    update_prices = database.update_prices
+    writes = []
+
+    def record_update_prices(prices: dict[str, dict]) -> None:
+        writes.append((threading.get_ident(), sorted(prices)))
+        update_prices(prices)
+
+    database.update_prices = record_update_prices
+
+    for data in [
+        {"sku": "263;6"} | get_item("263;6", 2.0),
+        {"sku": "378;6", "buy": "not a price"},
+        {"sku": "30469;1"} | get_item("30469;1", 2.0),
+        {"no": "sku"},
+        {"sku": "263;6"} | get_item("263;6", 3.0),
+        {"sku": "378;6"} | get_item("378;6", 2.0),
+    ]:
+        pricing_manager.price_events.put(data)
+
+    async def process() -> None:
+        task = asyncio.create_task(pricing_manager.process_price_updates())
+        await asyncio.sleep(0.2)
+
+        assert not task.done()
+        task.cancel()
+
+    asyncio.run(process())
+
+    # one batch, written in a worker thread, newest price for each sku
+    assert len(writes) == 1
+    assert writes[0][0] != threading.get_ident()
+    assert writes[0][1] == ["263;6", "378;6"]
+    assert database.get_item("263;6")["buy"]["metal"] == 3.0
+    assert database.get_item("378;6")["buy"]["metal"] == 2.0
+    assert "263;6" in pricing_manager.refresh_queue
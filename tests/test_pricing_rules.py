@@ -0,0 +1,115 @@
+import time
+
+from express.pricers.pricing_rules import PricingRules
+
+KEY_PRICES = {"buy": {"keys": 0, "metal": 60.0}, "sell": {"keys": 0, "metal": 60.11}}
+
+
+def price(buy: dict, sell: dict) -> dict:
+    return {"buy": buy, "sell": sell}
+
+
+def test_no_rules() -> None:
+    prices = {"263;6": price({"metal": 1.0}, {"metal": 1.11})}
+    rules = PricingRules([])
+
+    assert not rules
+    assert rules.apply(prices, KEY_PRICES) is prices
+
+
+def test_markups() -> None:
+    rules = PricingRules([{"buy_percent": -10, "sell_scrap": 2}])
+    prices = {
+        "263;6": price({"keys": 0, "metal": 1.0}, {"keys": 0, "metal": 1.11}),
+        "30469;1": price({"keys": 1, "metal": 0.0}, {"keys": 1, "metal": 5.0}),
+    }
+
+    assert rules.apply(prices, KEY_PRICES) == {
+        # 9 scrap -> 8.1 -> 8, 10 scrap + 2
+        "263;6": price({"keys": 0, "metal": 0.88}, {"keys": 0, "metal": 1.33}),
+        # 540 scrap -> 486, 586 scrap + 2
+        "30469;1": price({"keys": 0, "metal": 54.0}, {"keys": 1, "metal": 5.22}),
+    }
+
+
+def test_conditions() -> None:
+    rules = PricingRules(
+        [
+            {"quality": 1, "sell_scrap": 1},
+            {"sku": "263;*", "buy_scrap": -1},
+            {"tag": "hats", "sell_scrap": 9},
+        ]
+    )
+    prices = {
+        "263;6": price({"metal": 1.0}, {"metal": 1.11}),
+        "30469;1": price({"metal": 2.0}, {"metal": 2.11}),
+    }
+    tags = {"30469;1": ["hats"]}
+
+    assert rules.apply(prices, KEY_PRICES, tags) == {
+        "263;6": price({"keys": 0, "metal": 0.88}, {"keys": 0, "metal": 1.11}),
+        "30469;1": price({"keys": 0, "metal": 2.0}, {"keys": 0, "metal": 3.22}),
+    }
+
+
+def test_spread_and_clamps() -> None:
+    rules = PricingRules(
+        [
+            {"max_key_ratio": 0.5, "min_key_ratio": 0.1},
+            {"min_spread_scrap": 9},
+        ]
+    )
+    prices = {
+        "263;6": price({"metal": 1.0}, {"metal": 1.11}),
+        "30469;1": price({"metal": 50.0}, {"metal": 55.0}),
+    }
+
+    assert rules.apply(prices, KEY_PRICES) == {
+        # raised to 54 and 55 scrap, buy lowered to 46 for spread
+        "263;6": price({"keys": 0, "metal": 5.11}, {"keys": 0, "metal": 6.11}),
+        # lowered to half a key
+        "30469;1": price({"keys": 0, "metal": 29.0}, {"keys": 0, "metal": 30.0}),
+    }
+
+
+def test_key_stays_in_metal() -> None:
+    rules = PricingRules([{"sku": "5021;6", "sell_scrap": 1}])
+    prices = {"5021;6": KEY_PRICES}
+
+    assert rules.apply(prices, KEY_PRICES) == {
+        "5021;6": price({"keys": 0, "metal": 60.0}, {"keys": 0, "metal": 60.22})
+    }
+
+
+def test_only_matched_prices_change() -> None:
+    rules = PricingRules([{"sell_scrap": 1}, {"sku": "*;11", "buy_scrap": -1}])
+    prices = {
+        "5021;6": KEY_PRICES,
+        "263;6": price({"metal": 1.0}, {"metal": 1.11}),
+        "30469;1": price({"keys": 1, "metal": 0.0}, {"keys": 1, "metal": 5.0}),
+    }
+    repriced = rules.apply(prices, KEY_PRICES)
+
+    # keys are only changed by rules for keys, the rest keeps its format
+    assert repriced["5021;6"] is KEY_PRICES
+    assert repriced["263;6"]["sell"] == {"keys": 0, "metal": 1.22}
+
+    rules = PricingRules([{"sku": "*;11", "buy_scrap": -1}])
+
+    assert rules.apply(prices, KEY_PRICES) == prices
+
+
+def test_bulk_repricing_is_fast() -> None:
+    rules = PricingRules(
+        [{"sell_percent": 5, "buy_percent": -5}, {"quality": 11, "sell_scrap": 2}]
+    )
+    prices = {
+        f"{i};{6 if i % 2 else 11}": price({"metal": 10.0}, {"metal": 11.0})
+        for i in range(10_000)
+    }
+
+    start = time.perf_counter()
+    repriced = rules.apply(prices, KEY_PRICES)
+
+    assert len(repriced) == 10_000
+    assert time.perf_counter() - start < 1
@@ -0,0 +1,28 @@
+from express.pricers.refresh_queue import PriceRefreshQueue
+
+
+def test_refresh_queue() -> None:
+    queue = PriceRefreshQueue()
+    assert queue.get_oldest() is None
+
+    queue.set_items(
+        [
+            {"sku": "5021;6", "updated": 300.0},
+            {"sku": "263;6", "updated": 100.0},
+            {"sku": "30469;1"},
+        ]
+    )
+
+    assert len(queue) == 3
+    assert queue.get_oldest() == ("30469;1", 0.0)
+
+    queue.touch("30469;1", 400.0)
+    assert queue.get_oldest() == ("263;6", 100.0)
+
+    queue.touch("263;6", 500.0)
+    assert queue.get_oldest() == ("5021;6", 300.0)
+
+    # not autopriced, should be ignored
+    queue.touch("not;in;queue", 0.0)
+    assert "not;in;queue" not in queue
+    assert queue.get_oldest() == ("5021;6", 300.0)
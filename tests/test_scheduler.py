@@ -0,0 +1,112 @@
+import threading
+import time
+
+from express.backpack_tf import get_endpoint_class, get_request_lane
+from express.scheduler import RequestScheduler, TokenBucket
+
+
+class Response:
+    def __init__(self, status_code: int = 200, headers: dict = {}) -> None:
+        self.status_code = status_code
+        self.headers = headers
+
+
+def test_token_bucket() -> None:
+    bucket = TokenBucket(rate=10, capacity=2)
+
+    assert bucket.get_delay() == 0
+    bucket.consume()
+    bucket.consume()
+
+    assert 0 < bucket.get_delay() <= 0.1
+
+    bucket.pause(5)
+
+    assert 4.9 < bucket.get_delay() <= 5
+
+
+def test_get_request_lane() -> None:
+    assert get_request_lane("GET", "/users/info/v1", None) == "ban_check"
+    assert get_request_lane("POST", "/v2/classifieds/listings", {"id": 1}) == "sell"
+    assert get_request_lane("POST", "/v2/classifieds/listings", {}) == "buy"
+    assert (
+        get_request_lane("POST", "/v2/classifieds/listings/batch", [{}, {"id": 1}])
+        == "sell"
+    )
+    assert (
+        get_request_lane(
+            "DELETE", "/classifieds/delete/v1", {"listing_ids": ["440_7_abc"]}
+        )
+        == "buy"
+    )
+    assert get_request_lane("DELETE", "/v2/classifieds/listings/440_1", None) == "sell"
+    assert get_request_lane("POST", "/agent/pulse", None) == "other"
+
+    assert get_endpoint_class("/v2/classifieds/listings/batch") == "batch"
+    assert get_endpoint_class("/v2/classifieds/listings/440_1") == "listings"
+    assert get_endpoint_class("/users/info/v1") == "users"
+
+
+def test_scheduler_priority() -> None:
+    sent = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def request(name: str) -> Response:
+        # hold the worker until everything is queued
+        if name == "first":
+            started.set()
+            release.wait(1)
+
+        sent.append(name)
+        return Response()
+
+    scheduler = RequestScheduler({"a": TokenBucket(1000, 1000)}, request)
+    futures = [scheduler.submit("other", "a", "first")]
+    started.wait(1)
+
+    for lane in ["buy", "sell", "ban_check"]:
+        futures.append(scheduler.submit(lane, "a", lane))
+
+    release.set()
+
+    for future in futures:
+        future.result(1)
+
+    assert sent == ["first", "ban_check", "sell", "buy"]
+
+
+def test_scheduler_skips_throttled_bucket() -> None:
+    sent = []
+
+    def request(name: str) -> Response:
+        sent.append(name)
+        return Response()
+
+    throttled = TokenBucket(1, 1)
+    throttled.pause(0.2)
+    scheduler = RequestScheduler(
+        {"slow": throttled, "fast": TokenBucket(100, 5)}, request
+    )
+
+    slow = scheduler.submit("ban_check", "slow", "slow")
+    fast = scheduler.submit("buy", "fast", "fast")
+
+    fast.result(1)
+    slow.result(1)
+
+    assert sent == ["fast", "slow"]
+
+
+def test_scheduler_retry_after() -> None:
+    responses = [Response(429, {"Retry-After": "0.1"}), Response(200)]
+
+    def request() -> Response:
+        return responses.pop(0)
+
+    scheduler = RequestScheduler({"a": TokenBucket(100, 5)}, request)
+    start = time.monotonic()
+    response = scheduler.request("sell", "a")
+
+    assert response.status_code == 200
+    assert time.monotonic() - start >= 0.1
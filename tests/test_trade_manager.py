@@ -0,0 +1,51 @@
+import asyncio
+from dataclasses import replace
+from types import SimpleNamespace
+
+import pytest
+import steam
+
+from express.managers.inventory_manager import InventoryManager
+from express.managers.trade_manager import TradeManager
+from express.options import Options
+
+from .mock.database import Database
+from .mock.express import Express
+
+
+def test_pure_is_released_when_receipt_fails(steam_id: str, options: Options) -> None:
+    options = replace(
+        options, use_backpack_tf=False, enable_arbitrage=False, inventory_snapshot=False
+    )
+    client = Express(steam_id, options)
+    client.database = Database([])
+    client.pending_site_offers = {}
+    client.pending_offer_users = []
+    client.pricing_manager = SimpleNamespace(get_key_prices=lambda: {})
+    client.inventory_manager = InventoryManager(client)
+    client.inventory_manager.setup()
+    trade_manager = TradeManager(client)
+    trade_manager.setup()
+
+    client.inventory_manager.reserve_pure("1", [{"assetid": "2", "sku": "5002;6"}])
+    assert "1" in client.inventory_manager._reserved
+
+    async def receipt() -> None:
+        raise ConnectionError("Could not get receipt")
+
+    user = SimpleNamespace(id64=1, name="partner", is_friend=lambda: False)
+    trade = SimpleNamespace(
+        id=1,
+        user=user,
+        state=steam.TradeOfferState.Accepted,
+        message="",
+        receiving=[],
+        sending=[],
+        receipt=receipt,
+        _check_active=lambda: None,
+    )
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(trade_manager.process_offer_state(trade, {}))
+
+    assert "1" not in client.inventory_manager._reserved